@@ -4,8 +4,9 @@ Route module for the API
 """
 from os import getenv
 from api.v1.views import app_views
-from flask import Flask, jsonify, abort, request
+from flask import Flask, jsonify, abort, request, g
 from flask_cors import (CORS, cross_origin)
+from api.v1.auth.path_matcher import PathMatcher
 import os
 
 
@@ -27,10 +28,22 @@ if auth:
     elif auth == "session_db_auth":
         from api.v1.auth.session_db_auth import SessionDBAuth
         auth = SessionDBAuth()
+    elif auth == "session_token_auth":
+        from api.v1.auth.session_token_auth import SessionTokenAuth
+        auth = SessionTokenAuth()
     else:
         from api.v1.auth.auth import Auth
         auth = Auth()
 
+# paths reachable without authentication
+EXCLUDED_PATHS = PathMatcher(['/api/v1/status/',
+                              '/api/v1/unauthorized/',
+                              '/api/v1/forbidden/',
+                              '/api/v1/auth_session/login/'])
+# AUTH_DEBUG_HEADER=1 reports the auth resolutions of each request in an
+# X-Auth-Resolutions response header
+AUTH_DEBUG_HEADER = getenv('AUTH_DEBUG_HEADER', '0') == '1'
+
 
 @app.errorhandler(404)
 def not_found(error) -> str:
@@ -53,24 +66,41 @@ def forbidden(error) -> str:
     return jsonify({"error": "Forbidden"}), 403
 
 
+def current_user():
+    """ User authenticated by the request, resolved once per request
+    """
+    if 'current_user' not in g:
+        g.auth_resolutions = g.get('auth_resolutions', 0) + 1
+        g.current_user = auth.current_user(request)
+    return g.current_user
+
+
 @app.before_request
 def before_request_func():
     """ Before handler
     """
-    p_list = ['/api/v1/status/',
-              '/api/v1/unauthorized/',
-              '/api/v1/forbidden/',
-              '/api/v1/auth_session/login/']
-    request.current_user = auth.current_user(request)
+    request.current_user = None
     if auth is None:
         pass
-    elif not auth.require_auth(request.path, p_list):
+    elif not auth.require_auth(request.path, EXCLUDED_PATHS):
         pass
     elif auth.authorization_header(request) is None and \
             auth.session_cookie(request) is None:
         abort(401)
-    elif auth.current_user(request) is None:
-        abort(403)
+    else:
+        request.current_user = current_user()
+        if request.current_user is None:
+            abort(403)
+
+
+@app.after_request
+def after_request_func(response):
+    """ After handler
+    """
+    if AUTH_DEBUG_HEADER:
+        response.headers['X-Auth-Resolutions'] = str(
+            g.get('auth_resolutions', 0))
+    return response
 
 
 if __name__ == "__main__":
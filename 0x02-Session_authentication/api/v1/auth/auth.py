@@ -3,39 +3,42 @@
 Class to manager authentication
 """
 import os
-from typing import List, TypeVar
+from functools import lru_cache
+from typing import List, TypeVar, Union
 
 from flask import request
 
+from .path_matcher import PathMatcher
+
+
+@lru_cache(maxsize=32)
+def _compile(excluded_paths: tuple) -> PathMatcher:
+    """
+    Matcher of a list of excluded paths, compiled once per list
+    """
+    return PathMatcher(excluded_paths)
+
 
 class Auth:
     """
     Auth Class
     """
 
-    def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
+    def require_auth(self, path: str,
+                     excluded_paths: Union[List[str], PathMatcher]) -> bool:
         """
 
         :param path:
-        :param excluded_paths:
+        :param excluded_paths: list of paths, or a PathMatcher of them
         :return:
         """
         if path is None:
             return True
         elif excluded_paths is None or len(excluded_paths) == 0:
             return True
-        elif path in excluded_paths:
-            return False
-        else:
-            for i in excluded_paths:
-                if i.startswith(path):
-                    return False
-                if path.startswith(i):
-                    return False
-                if i[-1] == "*":
-                    if path.startswith(i[:-1]):
-                        return False
-        return True
+        if not isinstance(excluded_paths, PathMatcher):
+            excluded_paths = _compile(tuple(excluded_paths))
+        return not excluded_paths.matches(path)
 
     def authorization_header(self, request=None) -> str:
         """
@@ -3,16 +3,33 @@
 Basic Auth
 """
 from .auth import Auth
+from .credential_cache import CredentialCache
 import base64
+import os
 from models.user import User
 from typing import TypeVar
 
 
+def _env_number(name: str, default):
+    """
+    Number read from an environment variable, default if unset or invalid
+    """
+    try:
+        return type(default)(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
 class BasicAuth(Auth):
     """
     Basic Auth Class
     """
 
+    # Authorization header -> (user id, password hash) once verified
+    credential_cache = CredentialCache(
+        _env_number('BASIC_AUTH_CACHE_SIZE', 1024),
+        _env_number('BASIC_AUTH_CACHE_TTL', 300.0))
+
     def extract_base64_authorization_header(self,
                                             authorization_header: str) -> str:
         """
@@ -84,17 +101,38 @@ class BasicAuth(Auth):
         except Exception:
             return None
 
+    def _cached_user(self, cached: tuple) -> TypeVar('User'):
+        """
+        Returns the user of a cache entry, None if the user was removed
+        or changed email or password since it was cached
+        """
+        user_id, email, password = cached
+        user = User.get(user_id)
+        if user is None or user.email != email or \
+                user.password != password:
+            return None
+        return user
+
     def current_user(self, request=None) -> TypeVar('User'):
         """
         Returns a User instance based on a received request
         """
         Auth_header = self.authorization_header(request)
         if Auth_header is not None:
+            user = self.credential_cache.get(Auth_header, self._cached_user)
+            if user is not None:
+                return user
             token = self.extract_base64_authorization_header(Auth_header)
             if token is not None:
                 decoded = self.decode_base64_authorization_header(token)
                 if decoded is not None:
                     email, pword = self.extract_user_credentials(decoded)
                     if email is not None:
-                        return self.user_object_from_credentials(email, pword)
+                        user = self.user_object_from_credentials(email,
+                                                                 pword)
+                        if user is not None:
+                            self.credential_cache.put(
+                                Auth_header,
+                                (user.id, user.email, user.password))
+                        return user
         return
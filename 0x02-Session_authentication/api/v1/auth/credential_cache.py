@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Cache of verified credentials
+"""
+from collections import OrderedDict
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+
+class CredentialCache:
+    """
+    Bounded LRU cache, with a time to live, of what a verified
+    Authorization header resolved to
+
+    Headers are only kept as an HMAC digest under a per-process random
+    key, so the cache never holds a reusable credential.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        """
+        Initialize the cache
+        Args:
+            max_size (int): number of entries kept, 0 disables the cache
+            ttl (float): seconds an entry stays valid
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.__key = os.urandom(32)
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def _digest(self, header: str) -> bytes:
+        """
+        Keyed digest of a header
+        """
+        return hmac.new(self.__key, header.encode('utf-8'),
+                        hashlib.sha256).digest()
+
+    def get(self, header: str, resolve):
+        """
+        Returns resolve(value) for the value cached for header, or None
+        when there is none or resolve rejects it as stale
+        """
+        key = self._digest(header)
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[1] < now:
+                del self.__entries[key]
+                entry = None
+            if entry is not None:
+                self.__entries.move_to_end(key)
+        obj = None if entry is None else resolve(entry[0])
+        with self.__lock:
+            if obj is None:
+                if entry is not None:
+                    self.__entries.pop(key, None)
+                self.misses += 1
+            else:
+                self.hits += 1
+        return obj
+
+    def put(self, header: str, value):
+        """
+        Cache value for header, evicting the least recently used entry
+        when full
+        """
+        if self.max_size <= 0:
+            return
+        key = self._digest(header)
+        with self.__lock:
+            self.__entries[key] = (value, time.monotonic() + self.ttl)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop every entry
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and current size
+        """
+        with self.__lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self.__entries)}
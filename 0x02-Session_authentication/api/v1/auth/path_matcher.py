@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Matcher of the paths excluded from authentication
+"""
+from functools import lru_cache
+from typing import Iterable
+
+
+class PathMatcher:
+    """
+    Excluded paths compiled once into a character trie
+
+    A path matches an entry when either is a prefix of the other, or when
+    it starts with an entry ending with "*" minus the "*", the rules of
+    Auth.require_auth. A match walks the path once, whatever the number
+    of entries, and recent answers are cached.
+    """
+
+    def __init__(self, excluded_paths: Iterable[str],
+                 cache_size: int = 1024):
+        """
+        Compile excluded_paths
+        Args:
+            excluded_paths (list): excluded paths, "*" ending a wildcard
+            cache_size (int): number of recent answers kept
+        """
+        self.paths = tuple(excluded_paths)
+        # each node: {char: child node}, None keyed when an entry ends there
+        self.__root = {}
+        for path in self.paths:
+            self._insert(path)
+            if path and path[-1] == "*":
+                self._insert(path[:-1])
+        self.matches = lru_cache(maxsize=cache_size)(self._walk)
+
+    def _insert(self, path: str):
+        """
+        Add one entry to the trie
+        """
+        node = self.__root
+        for char in path:
+            node = node.setdefault(char, {})
+        node[None] = True
+
+    def _walk(self, path: str) -> bool:
+        """
+        Whether path matches an entry
+        """
+        if not self.paths:
+            return False
+        node = self.__root
+        for char in path:
+            if None in node:
+                # an entry is a prefix of the path
+                return True
+            node = node.get(char)
+            if node is None:
+                return False
+        # the path is a prefix of an entry
+        return True
+
+    def __contains__(self, path: str) -> bool:
+        """
+        `path in matcher`
+        """
+        return self.matches(path)
+
+    def __len__(self) -> int:
+        """
+        Number of entries
+        """
+        return len(self.paths)
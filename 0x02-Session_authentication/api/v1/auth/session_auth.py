@@ -5,6 +5,7 @@ Session Auth Class
 from uuid import uuid4
 from models.user import User
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import new_session_store
 
 
 class SessionAuth(Auth):
@@ -12,7 +13,13 @@ class SessionAuth(Auth):
     Session Auth class
     """
 
-    user_id_by_session_id = {}
+    user_id_by_session_id = new_session_store()
+
+    def _session_value(self, user_id: str):
+        """
+        Value stored for a new session of user_id
+        """
+        return user_id
 
     def create_session(self, user_id: str = None) -> str:
         """Create a session"""
@@ -21,9 +28,11 @@ class SessionAuth(Auth):
         elif not isinstance(user_id, str):
             return None
         else:
-            idd = uuid4()
-            self.user_id_by_session_id[str(idd)] = user_id
-            return str(idd)
+            idd = str(uuid4())
+            # one insert, so no request sees a half-built session
+            self.user_id_by_session_id.create(idd,
+                                              self._session_value(user_id))
+            return idd
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
         """
@@ -60,5 +69,16 @@ class SessionAuth(Auth):
         user_id = self.user_id_for_session_id(session_cookie)
         if user_id is None:
             return False
-        del self.user_id_by_session_id[session_cookie]
+        # pop: a sweeper may have evicted it meanwhile
+        self.user_id_by_session_id.pop(session_cookie, None)
+        return True
+
+    def destroy_all_sessions(self, user_id: str = None) -> bool:
+        """
+        Deletes every session of a user, found through the user id index
+        of the session store
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return False
+        self.user_id_by_session_id.pop_user(user_id)
         return True
@@ -18,14 +18,13 @@ class SessionDBAuth(SessionExpAuth):
             return None
         user_session = UserSession(user_id=user_id, session_id=session_id)
         user_session.save()
-        UserSession.save_to_file()
         return session_id
 
     def user_id_for_session_id(self, session_id=None):
         """user_id_for_session_id - returns user_id from session"""
         if not session_id:
             return None
-        UserSession.load_from_file()
+        UserSession.refresh()
         users = UserSession.search({'session_id': session_id})
         for user in users:
             if user.created_at + timedelta(
@@ -45,5 +44,15 @@ class SessionDBAuth(SessionExpAuth):
         users = UserSession.search({'session_id': session_id})
         for user in users:
             user.remove()
-            UserSession.save_to_file()
+        return True
+
+    def destroy_all_sessions(self, user_id=None):
+        """destroy_all_sessions - logout every session of a user, in one
+        storage write"""
+        if not super().destroy_all_sessions(user_id):
+            return False
+        UserSession.refresh()
+        with UserSession.transaction():
+            for user_session in UserSession.search({'user_id': user_id}):
+                user_session.remove()
         return True
@@ -3,6 +3,10 @@
 Define SessionExpAuth class
 """
 import os
+import threading
+import time
+from collections import deque
+from itertools import takewhile
 from datetime import (
     datetime,
     timedelta
@@ -15,6 +19,11 @@ class SessionExpAuth(SessionAuth):
     """
     Definition of class SessionExpAuth that adds an
     expiration date to a Session ID
+
+    Sessions all live session_duration seconds, so they expire in the
+    order they were created: a FIFO of (expires_at, session_id) is their
+    expiry index, and a background sweeper pops the expired ones from
+    its front, each session being pushed and popped once.
     """
     def __init__(self):
         """
@@ -25,6 +34,24 @@ class SessionExpAuth(SessionAuth):
         except Exception:
             duration = 0
         self.session_duration = duration
+        try:
+            interval = float(os.getenv('SESSION_SWEEP_INTERVAL', 60))
+        except ValueError:
+            interval = 60
+        self.sweep_interval = interval
+        self.evicted_count = 0
+        self.__expiries = deque()
+        self.__lock = threading.Lock()
+        self.__sweeper = None
+
+    def _session_value(self, user_id):
+        """
+        Session dictionary of a new session of user_id
+        """
+        return {
+            "user_id": user_id,
+            "created_at": datetime.now()
+        }
 
     def create_session(self, user_id=None):
         """
@@ -35,11 +62,12 @@ class SessionExpAuth(SessionAuth):
         session_id = super().create_session(user_id)
         if session_id is None:
             return None
-        session_dictionary = {
-            "user_id": user_id,
-            "created_at": datetime.now()
-        }
-        self.user_id_by_session_id[session_id] = session_dictionary
+        expires_at = self._expires_at(self.user_id_by_session_id.get(
+            session_id))
+        if self.session_duration > 0 and expires_at is not None:
+            with self.__lock:
+                self.__expiries.append((expires_at, session_id))
+            self._start_sweeper()
         return session_id
 
     def user_id_for_session_id(self, session_id=None):
@@ -64,3 +92,69 @@ class SessionExpAuth(SessionAuth):
         if allowed_window < datetime.now():
             return None
         return user_details.get("user_id")
+
+    def _expires_at(self, user_details) -> datetime:
+        """
+        Expiry of a session dictionary, None if it has none
+        """
+        if not isinstance(user_details, dict) or \
+                "created_at" not in user_details:
+            return None
+        return user_details["created_at"] + timedelta(
+            seconds=self.session_duration)
+
+    def sweep(self) -> int:
+        """
+        Evict every expired session
+        Return:
+            number of sessions evicted
+        """
+        now = datetime.now()
+        evicted = 0
+        with self.__lock:
+            while self.__expiries and self.__expiries[0][0] < now:
+                expires_at, session_id = self.__expiries.popleft()
+                # skip the sessions destroyed or replaced since
+                if self.user_id_by_session_id.pop_if(
+                        session_id,
+                        lambda details: self._expires_at(details) ==
+                        expires_at):
+                    evicted += 1
+            self.evicted_count += evicted
+        return evicted
+
+    def _sweep_loop(self):
+        """
+        Body of the sweeper thread
+        """
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def _start_sweeper(self):
+        """
+        Start the sweeper thread on the first expiring session
+        """
+        if self.__sweeper is None:
+            with self.__lock:
+                if self.__sweeper is None:
+                    self.__sweeper = threading.Thread(
+                        target=self._sweep_loop, daemon=True)
+                    self.__sweeper.start()
+
+    def session_metrics(self) -> dict:
+        """
+        Counts of live sessions, of expired sessions not evicted yet and
+        of sessions evicted so far
+        """
+        now = datetime.now()
+        with self.__lock:
+            expired = sum(1 for expires_at, session_id in takewhile(
+                lambda entry: entry[0] < now, self.__expiries)
+                if self._expires_at(self.user_id_by_session_id.get(
+                    session_id)) == expires_at)
+            return {
+                "live": len(self.user_id_by_session_id) - expired,
+                "expired": expired,
+                "evicted": self.evicted_count,
+            }
@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Thread-safe stores of the sessions
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable
+
+
+# SESSION_STORE selects where SessionAuth keeps its sessions: "memory"
+# (default) in each process, "sqlite" in an SQLite database shared by
+# every worker process of the host
+SESSION_STORE = os.getenv('SESSION_STORE', 'memory')
+SESSION_STORE_PATH = os.getenv('SESSION_STORE_PATH', '.db_sessions.sqlite3')
+SESSION_STORE_CACHE_SIZE = int(os.getenv('SESSION_STORE_CACHE_SIZE',
+                                         '100000'))
+
+
+def _user_id_of(value) -> str:
+    """
+    User id of a session value: the value itself, or its "user_id"
+    """
+    if isinstance(value, dict):
+        return value.get("user_id")
+    return value
+
+
+class SessionStore:
+    """
+    Session id -> session value, striped across shards
+
+    Each shard is a dict with its own lock, picked by the hash of the
+    session id, so writes to different shards never wait for each other.
+    Lookups take no lock: a single dict read is atomic in CPython.
+
+    A reverse index, user id -> session ids, is striped the same way by
+    user id. Writes lock the session shard, then the user shard.
+    """
+
+    def __init__(self, shards: int = 64):
+        """
+        Initialize the store
+        Args:
+            shards (int): number of shards, rounded up to a power of two
+        """
+        size = 1
+        while size < shards:
+            size *= 2
+        self.__mask = size - 1
+        self.__shards = [{} for _ in range(size)]
+        self.__locks = [threading.Lock() for _ in range(size)]
+        # user_shards[i][user id] = {session id: None}
+        self.__user_shards = [{} for _ in range(size)]
+        self.__user_locks = [threading.Lock() for _ in range(size)]
+
+    def _shard(self, session_id: str) -> int:
+        """
+        Shard index of a session id, or of a user id
+        """
+        return hash(session_id) & self.__mask
+
+    def _index_add(self, session_id: str, value):
+        """
+        Add a session to the reverse index
+        """
+        user_id = _user_id_of(value)
+        i = self._shard(user_id)
+        with self.__user_locks[i]:
+            self.__user_shards[i].setdefault(user_id, {})[session_id] = None
+
+    def _index_remove(self, session_id: str, value):
+        """
+        Remove a session from the reverse index
+        """
+        user_id = _user_id_of(value)
+        i = self._shard(user_id)
+        with self.__user_locks[i]:
+            session_ids = self.__user_shards[i].get(user_id)
+            if session_ids is not None:
+                session_ids.pop(session_id, None)
+                if not session_ids:
+                    del self.__user_shards[i][user_id]
+
+    def get(self, session_id: str, default=None):
+        """
+        Value of a session, default if there is none
+        """
+        return self.__shards[self._shard(session_id)].get(session_id,
+                                                          default)
+
+    def create(self, session_id: str, value) -> bool:
+        """
+        Store a new session, False if the id is already taken
+        """
+        i = self._shard(session_id)
+        with self.__locks[i]:
+            if session_id in self.__shards[i]:
+                return False
+            self.__shards[i][session_id] = value
+            self._index_add(session_id, value)
+            return True
+
+    def __setitem__(self, session_id: str, value):
+        """
+        Store or replace a session
+        """
+        i = self._shard(session_id)
+        with self.__locks[i]:
+            if session_id in self.__shards[i]:
+                self._index_remove(session_id, self.__shards[i][session_id])
+            self.__shards[i][session_id] = value
+            self._index_add(session_id, value)
+
+    def __getitem__(self, session_id: str):
+        """
+        Value of a session, KeyError if there is none
+        """
+        return self.__shards[self._shard(session_id)][session_id]
+
+    def __delitem__(self, session_id: str):
+        """
+        Remove a session, KeyError if there is none
+        """
+        i = self._shard(session_id)
+        with self.__locks[i]:
+            value = self.__shards[i].pop(session_id)
+            self._index_remove(session_id, value)
+
+    def pop(self, session_id: str, default=None):
+        """
+        Remove a session and return its value, default if there is none
+        """
+        i = self._shard(session_id)
+        with self.__locks[i]:
+            if session_id not in self.__shards[i]:
+                return default
+            value = self.__shards[i].pop(session_id)
+            self._index_remove(session_id, value)
+            return value
+
+    def pop_if(self, session_id: str, predicate: Callable) -> bool:
+        """
+        Remove a session only if predicate(value) holds, atomically
+        """
+        i = self._shard(session_id)
+        with self.__locks[i]:
+            shard = self.__shards[i]
+            if session_id not in shard or not predicate(shard[session_id]):
+                return False
+            self._index_remove(session_id, shard.pop(session_id))
+            return True
+
+    def session_ids(self, user_id: str) -> list:
+        """
+        Ids of the sessions of a user
+        """
+        i = self._shard(user_id)
+        with self.__user_locks[i]:
+            return list(self.__user_shards[i].get(user_id, ()))
+
+    def pop_user(self, user_id: str) -> int:
+        """
+        Remove every session of a user
+        Return:
+            number of sessions removed
+        """
+        removed = 0
+        for session_id in self.session_ids(user_id):
+            removed += self.pop_if(
+                session_id, lambda value: _user_id_of(value) == user_id)
+        return removed
+
+    def __contains__(self, session_id: str) -> bool:
+        """
+        Whether a session exists
+        """
+        return session_id in self.__shards[self._shard(session_id)]
+
+    def __len__(self) -> int:
+        """
+        Number of sessions
+        """
+        return sum(len(shard) for shard in self.__shards)
+
+    def items(self) -> list:
+        """
+        Snapshot of the (session id, value) pairs
+        """
+        items = []
+        for lock, shard in zip(self.__locks, self.__shards):
+            with lock:
+                items.extend(shard.items())
+        return items
+
+    def clear(self):
+        """
+        Remove every session
+        """
+        for lock, shard in zip(self.__locks, self.__shards):
+            with lock:
+                for session_id, value in shard.items():
+                    self._index_remove(session_id, value)
+                shard.clear()
+
+
+def _encode(value) -> str:
+    """
+    JSON of a session value, datetimes included
+    """
+    return json.dumps(value, default=lambda o: {
+        "__datetime__": o.isoformat()})
+
+
+def _decode_object(obj: dict):
+    """
+    JSON object hook turning _encode datetimes back
+    """
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def _decode(data: str):
+    """
+    Session value of _encode output
+    """
+    return json.loads(data, object_hook=_decode_object)
+
+
+class SQLiteSessionStore:
+    """
+    Session id -> session value in an SQLite table, shared by processes
+
+    The database runs in WAL mode, so lookups never wait for a writer.
+    Each process writes through one connection of the store, and keeps a
+    read cache of the sessions it looked up, dropped as soon as PRAGMA
+    data_version on that connection shows another process committed.
+    Lookups use connections of a pool, reused from request to request.
+    """
+
+    def __init__(self, db_path: str = None,
+                 cache_size: int = SESSION_STORE_CACHE_SIZE):
+        """
+        Initialize the store on db_path
+        """
+        self.__path = db_path or SESSION_STORE_PATH
+        # connection of the writes and of the data_version checks,
+        # opened on first use
+        self.__conn = None
+        self.__conn_lock = threading.RLock()
+        self.__data_version = None
+        # idle read connections
+        self.__readers = []
+        self.__readers_lock = threading.Lock()
+        self.cache_size = cache_size
+        self.__cache = {}
+        # bumped on every cache drop, so a lookup that read the database
+        # before a drop doesn't put its stale value back
+        self.__generation = 0
+        self.__cache_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        New autocommit connection, usable from any thread
+        """
+        return sqlite3.connect(self.__path, timeout=30,
+                               isolation_level=None,
+                               check_same_thread=False)
+
+    @contextmanager
+    def _writer(self):
+        """
+        Connection of the store, held by the calling thread for the block
+        """
+        with self.__conn_lock:
+            if self.__conn is None:
+                self.__conn = self._open()
+            yield self.__conn
+
+    @contextmanager
+    def _reader(self):
+        """
+        Read connection from the pool for the block
+        """
+        if self.__conn is None:
+            # the table is created before the first read
+            with self._writer():
+                pass
+        with self.__readers_lock:
+            conn = self.__readers.pop() if self.__readers else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            with self.__readers_lock:
+                self.__readers.append(conn)
+
+    def _open(self) -> sqlite3.Connection:
+        """
+        Connection of the store, creating or upgrading the table
+        """
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                     "session_id TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                     "user_id TEXT)")
+        columns = {row[1] for row in conn.execute(
+            "PRAGMA table_info(sessions)")}
+        if "user_id" not in columns:
+            conn.execute("ALTER TABLE sessions ADD COLUMN user_id TEXT")
+            conn.execute(
+                "UPDATE sessions SET user_id = CASE "
+                "WHEN json_type(value) = 'object' "
+                "THEN json_extract(value, '$.user_id') "
+                "ELSE json_extract(value, '$') END")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_user_id "
+                     "ON sessions (user_id)")
+        return conn
+
+    def _validate_cache(self) -> int:
+        """
+        Drop the cache if another process committed since the last
+        check, and return the cache generation
+        """
+        with self._writer() as conn:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with self.__cache_lock:
+            if version != self.__data_version:
+                # nothing was read before the first check, only our own
+                # writes are cached
+                if self.__data_version is not None:
+                    self.__cache.clear()
+                    self.__generation += 1
+                self.__data_version = version
+            return self.__generation
+
+    def _cache_put(self, session_id: str, value, generation: int = None):
+        """
+        Cache a session value, unless the cache was dropped since
+        generation
+        """
+        with self.__cache_lock:
+            if generation is not None and generation != self.__generation:
+                return
+            if len(self.__cache) >= self.cache_size:
+                self.__cache.clear()
+            self.__cache[session_id] = value
+
+    def _cache_drop(self, session_id: str):
+        """
+        Forget a cached session
+        """
+        with self.__cache_lock:
+            self.__cache.pop(session_id, None)
+            self.__generation += 1
+
+    def get(self, session_id: str, default=None):
+        """
+        Value of a session, default if there is none
+        """
+        generation = self._validate_cache()
+        value = self.__cache.get(session_id, default)
+        if value is not default:
+            return value
+        with self._reader() as conn:
+            row = conn.execute(
+                "SELECT value FROM sessions WHERE session_id = ?",
+                (session_id,)).fetchone()
+        if row is None:
+            return default
+        value = _decode(row[0])
+        self._cache_put(session_id, value, generation)
+        return value
+
+    def create(self, session_id: str, value) -> bool:
+        """
+        Store a new session, False if the id is already taken
+        """
+        try:
+            with self._writer() as conn:
+                conn.execute(
+                    "INSERT INTO sessions (session_id, value, user_id) "
+                    "VALUES (?, ?, ?)",
+                    (session_id, _encode(value), _user_id_of(value)))
+        except sqlite3.IntegrityError:
+            return False
+        self._cache_put(session_id, value)
+        return True
+
+    def __setitem__(self, session_id: str, value):
+        """
+        Store or replace a session
+        """
+        with self._writer() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, value, "
+                "user_id) VALUES (?, ?, ?)",
+                (session_id, _encode(value), _user_id_of(value)))
+        self._cache_drop(session_id)
+
+    def __getitem__(self, session_id: str):
+        """
+        Value of a session, KeyError if there is none
+        """
+        missing = object()
+        value = self.get(session_id, missing)
+        if value is missing:
+            raise KeyError(session_id)
+        return value
+
+    def __delitem__(self, session_id: str):
+        """
+        Remove a session, KeyError if there is none
+        """
+        missing = object()
+        if self.pop(session_id, missing) is missing:
+            raise KeyError(session_id)
+
+    def pop(self, session_id: str, default=None):
+        """
+        Remove a session and return its value, default if there is none
+        """
+        with self._writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value FROM sessions WHERE session_id = ?",
+                    (session_id,)).fetchone()
+                conn.execute("DELETE FROM sessions WHERE session_id = ?",
+                             (session_id,))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        self._cache_drop(session_id)
+        return default if row is None else _decode(row[0])
+
+    def pop_if(self, session_id: str, predicate: Callable) -> bool:
+        """
+        Remove a session only if predicate(value) holds, atomically
+        """
+        with self._writer() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value FROM sessions WHERE session_id = ?",
+                    (session_id,)).fetchone()
+                removed = row is not None and predicate(_decode(row[0]))
+                if removed:
+                    conn.execute(
+                        "DELETE FROM sessions WHERE session_id = ?",
+                        (session_id,))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        if removed:
+            self._cache_drop(session_id)
+        return removed
+
+    def session_ids(self, user_id: str) -> list:
+        """
+        Ids of the sessions of a user
+        """
+        with self._reader() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT session_id FROM sessions WHERE user_id = ?",
+                (user_id,))]
+
+    def pop_user(self, user_id: str) -> int:
+        """
+        Remove every session of a user in one DELETE
+        Return:
+            number of sessions removed
+        """
+        with self._writer() as conn:
+            removed = conn.execute(
+                "DELETE FROM sessions WHERE user_id = ?",
+                (user_id,)).rowcount
+        with self.__cache_lock:
+            self.__cache.clear()
+            self.__generation += 1
+        return removed
+
+    def __contains__(self, session_id: str) -> bool:
+        """
+        Whether a session exists
+        """
+        missing = object()
+        return self.get(session_id, missing) is not missing
+
+    def __len__(self) -> int:
+        """
+        Number of sessions
+        """
+        with self._reader() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def items(self) -> list:
+        """
+        Snapshot of the (session id, value) pairs
+        """
+        with self._reader() as conn:
+            rows = conn.execute(
+                "SELECT session_id, value FROM sessions").fetchall()
+        return [(session_id, _decode(value)) for session_id, value in rows]
+
+    def clear(self):
+        """
+        Remove every session
+        """
+        with self._writer() as conn:
+            conn.execute("DELETE FROM sessions")
+        with self.__cache_lock:
+            self.__cache.clear()
+            self.__generation += 1
+
+
+def new_session_store():
+    """
+    Session store selected by SESSION_STORE
+    """
+    if SESSION_STORE == "sqlite":
+        return SQLiteSessionStore()
+    return SessionStore()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Define SessionTokenAuth class
+"""
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from uuid import uuid4
+
+from .session_auth import SessionAuth
+
+
+def _b64encode(data: bytes) -> str:
+    """
+    URL-safe base64 without padding, safe in a cookie
+    """
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    """
+    Decode _b64encode output
+    """
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _load_keys() -> list:
+    """
+    Signing keys from SESSION_TOKEN_KEYS, "kid:secret,kid:secret", the
+    first one signing; a random key when unset, logged as tokens then
+    only verify in the process that signed them and die with it
+    """
+    keys = []
+    for entry in os.getenv('SESSION_TOKEN_KEYS', '').split(','):
+        kid, _, secret = entry.strip().partition(':')
+        if kid and secret:
+            keys.append((kid, secret.encode('utf-8')))
+    if not keys:
+        logging.getLogger(__name__).warning(
+            "SESSION_TOKEN_KEYS is not set: signing session tokens with a "
+            "random key, they are rejected by other worker processes and "
+            "invalidated by a restart")
+        keys.append((uuid4().hex[:8], os.urandom(32)))
+    return keys
+
+
+class SessionTokenAuth(SessionAuth):
+    """
+    Definition of class SessionTokenAuth: the session cookie is a signed
+    token carrying the user id and the expiry, checked without any store
+
+        <kid>.<base64 payload>.<base64 HMAC-SHA256 of kid.payload>
+
+    Tokens are signed with the first key of SESSION_TOKEN_KEYS and
+    verified with any of them, so a new key is rolled out by putting it
+    first while the old one keeps verifying the tokens already issued.
+    Logouts revoke the token id until its expiry; logging a user out
+    everywhere revokes the tokens issued to them until then.
+    """
+    def __init__(self):
+        """
+        Initialize the class
+        """
+        try:
+            duration = int(os.getenv('SESSION_DURATION'))
+        except Exception:
+            duration = 0
+        # a token can't be taken back once issued, so it always expires
+        self.session_duration = duration if duration > 0 else 86400
+        self.keys = _load_keys()
+        self.__keys_by_id = dict(self.keys)
+        # revoked[token id] = expiry, dropped once the token expired
+        self.__revoked = {}
+        # revoked_before[user id] = time before which its tokens were
+        # issued are revoked
+        self.__revoked_before = {}
+        self.__revoked_lock = threading.Lock()
+        self.__purge_size = 64
+
+    def create_session(self, user_id: str = None) -> str:
+        """
+        Create a session token for a user_id
+        Args:
+            user_id (str): user id
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return None
+        now = time.time()
+        payload = _b64encode(json.dumps({
+            "uid": user_id,
+            "iat": now,
+            "exp": int(now) + self.session_duration,
+            "jti": uuid4().hex,
+        }, separators=(',', ':')).encode('utf-8'))
+        kid, secret = self.keys[0]
+        return "{}.{}.{}".format(kid, payload,
+                                 self._signature(secret, kid, payload))
+
+    @staticmethod
+    def _signature(secret: bytes, kid: str, payload: str) -> str:
+        """
+        Signature of a token
+        """
+        message = "{}.{}".format(kid, payload).encode('utf-8')
+        return _b64encode(hmac.new(secret, message, hashlib.sha256).digest())
+
+    def _payload(self, session_id: str) -> dict:
+        """
+        Payload of a token with a valid signature that is neither expired
+        nor revoked, None otherwise
+        """
+        if not isinstance(session_id, str):
+            return None
+        parts = session_id.split('.')
+        if len(parts) != 3:
+            return None
+        kid, payload, signature = parts
+        secret = self.__keys_by_id.get(kid)
+        # compared as bytes, compare_digest refuses non-ASCII str
+        if secret is None or not hmac.compare_digest(
+                signature.encode('utf-8'),
+                self._signature(secret, kid, payload).encode('ascii')):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except (binascii.Error, ValueError):
+            return None
+        if not isinstance(claims, dict) or \
+                not isinstance(claims.get("exp"), int) or \
+                claims["exp"] < time.time():
+            return None
+        if claims.get("jti") in self.__revoked:
+            return None
+        revoked_before = self.__revoked_before.get(claims.get("uid"))
+        if revoked_before is not None and \
+                not claims.get("iat", 0) > revoked_before:
+            return None
+        return claims
+
+    def user_id_for_session_id(self, session_id: str = None) -> str:
+        """
+        Returns the user ID of a session token
+        Args:
+            session_id (str): session token
+        Return:
+            user id or None if the token is invalid, expired or revoked
+        """
+        claims = self._payload(session_id)
+        if claims is None:
+            return None
+        return claims.get("uid")
+
+    def revoke(self, session_id: str) -> bool:
+        """
+        Revoke a valid token until it expires
+        """
+        claims = self._payload(session_id)
+        if claims is None:
+            return False
+        with self.__revoked_lock:
+            self.__revoked[claims["jti"]] = claims["exp"]
+            self._purge()
+        return True
+
+    def _purge(self):
+        """
+        Drop the revocations of expired tokens whenever the lists doubled,
+        called with the revocation lock held
+        """
+        if len(self.__revoked) + len(self.__revoked_before) < \
+                self.__purge_size:
+            return
+        now = time.time()
+        self.__revoked = {jti: exp for jti, exp
+                          in self.__revoked.items() if exp >= now}
+        self.__revoked_before = {
+            uid: before for uid, before in self.__revoked_before.items()
+            if before + self.session_duration >= now}
+        self.__purge_size = max(
+            64, 2 * (len(self.__revoked) + len(self.__revoked_before)))
+
+    def destroy_all_sessions(self, user_id: str = None) -> bool:
+        """
+        Revokes every token issued to a user so far
+        """
+        if user_id is None or not isinstance(user_id, str):
+            return False
+        with self.__revoked_lock:
+            self.__revoked_before[user_id] = time.time()
+            self._purge()
+        return True
+
+    def destroy_session(self, request=None) -> bool:
+        """
+        Deletes a user session by revoking its token
+        """
+        if request is None:
+            return False
+        return self.revoke(self.session_cookie(request))
@@ -18,11 +18,15 @@ def status() -> str:
 def stats() -> str:
     """ GET /api/v1/stats
     Return:
-      - the number of each objects
+      - the number of each objects, and the session counts of
+        authentications expiring them
     """
     from models.user import User
+    from api.v1.app import auth
     stats = {}
     stats['users'] = User.count()
+    if hasattr(auth, 'session_metrics'):
+        stats['sessions'] = auth.session_metrics()
     return jsonify(stats)
 
 
@@ -44,3 +44,17 @@ def handle_logout():
     if auth.destroy_session(request):
         return jsonify({}), 200
     abort(404)
+
+
+@app_views.route('/auth_session/logout_all', methods=['DELETE'],
+                 strict_slashes=False)
+def handle_logout_all():
+    """
+    Handle user logout from every session
+    """
+    from api.v1.app import auth
+    if request.current_user is None or \
+            not hasattr(auth, 'destroy_all_sessions'):
+        abort(404)
+    auth.destroy_all_sessions(request.current_user.id)
+    return jsonify({}), 200
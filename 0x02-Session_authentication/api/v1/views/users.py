@@ -2,19 +2,54 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request, url_for
 from models.user import User
 from typing import TypeVar
+import json
+
+MAX_PAGE_SIZE = 1000
+
+
+def _stream_users():
+    """ Yield the JSON array of all users piece by piece
+    """
+    yield "["
+    separator = ""
+    for user in User.iterate():
+        yield separator + json.dumps(user.to_json(), sort_keys=True)
+        separator = ","
+    yield "]\n"
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (optional):
+      - limit: page size, at most MAX_PAGE_SIZE
+      - cursor: ID of the last user of the previous page
     Return:
-      - list of all User objects JSON represented
+      - list of all User objects JSON represented, streamed when no
+        limit is given
+      - one page of users ordered by ID when limit is given, with a
+        Link header to the next page if any
+      - 400 if limit isn't a positive integer
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    limit = request.args.get('limit')
+    if limit is None:
+        return Response(_stream_users(), mimetype='application/json')
+    try:
+        limit = int(limit)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return jsonify({'error': "limit must be a positive integer"}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+    users, cursor = User.page(limit, request.args.get('cursor'))
+    resp = jsonify([user.to_json() for user in users])
+    if cursor is not None:
+        resp.headers['Link'] = '<{}>; rel="next"'.format(
+            url_for('app_views.view_all_users', limit=limit, cursor=cursor))
+    return resp
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
@@ -59,6 +94,9 @@ def delete_user(user_id: str = None) -> str:
     if user is None:
         abort(404)
     user.remove()
+    from api.v1.app import auth
+    if hasattr(auth, 'destroy_all_sessions'):
+        auth.destroy_all_sessions(user.id)
     return jsonify({}), 200
 
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+""" Memory footprint of model instances
+
+Compares the bytes held per UserSession by the slotted models with the
+previous __dict__ layout holding two datetime objects.
+
+    $ python3 -m benchmarks.model_memory [count]
+"""
+from datetime import datetime
+import sys
+import tracemalloc
+import uuid
+
+from models.user_session import UserSession
+
+
+class DictUserSession():
+    """ Previous layout: every field in the instance __dict__
+    """
+
+    def __init__(self, **kwargs):
+        """ Initialize like the former Base + UserSession
+        """
+        self.id = kwargs.get('id', str(uuid.uuid4()))
+        self.created_at = datetime.utcnow()
+        self.updated_at = datetime.utcnow()
+        self.user_id = kwargs.get('user_id')
+        self.session_id = kwargs.get('session_id')
+
+
+def bytes_per_object(factory, count: int) -> float:
+    """ Average traced allocation of count objects built by factory
+    """
+    # the ids are built first so only the objects themselves are measured
+    records = [(str(uuid.uuid4()), str(uuid.uuid4()),
+                "user-{}".format(i % 100)) for i in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objs = [factory(id=obj_id, session_id=session_id, user_id=user_id)
+            for obj_id, session_id, user_id in records]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objs
+    return used / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    before = bytes_per_object(DictUserSession, count)
+    after = bytes_per_object(UserSession, count)
+    print("objects:          {}".format(count))
+    print("__dict__ layout:  {:.0f} bytes/object".format(before))
+    print("__slots__ layout: {:.0f} bytes/object".format(after))
+    print("saved:            {:.0%}".format(1 - after / before))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+""" Session store throughput under many threads
+
+Drives a read-heavy mix (95% lookups, 4% creates, 1% destroys) from a
+growing number of threads, against the striped SessionStore and against
+a dict behind one global lock.
+
+    $ python3 -m benchmarks.session_store [operations per thread]
+"""
+import random
+import sys
+import threading
+import time
+import uuid
+
+from api.v1.auth.session_store import SessionStore
+
+
+class GlobalLockStore():
+    """ Dict guarded by a single lock, lookups included
+    """
+
+    def __init__(self):
+        """ Initialize the store
+        """
+        self.__sessions = {}
+        self.__lock = threading.Lock()
+
+    def get(self, session_id: str, default=None):
+        """ Value of a session
+        """
+        with self.__lock:
+            return self.__sessions.get(session_id, default)
+
+    def create(self, session_id: str, value) -> bool:
+        """ Store a new session
+        """
+        with self.__lock:
+            if session_id in self.__sessions:
+                return False
+            self.__sessions[session_id] = value
+            return True
+
+    def pop(self, session_id: str, default=None):
+        """ Remove a session
+        """
+        with self.__lock:
+            return self.__sessions.pop(session_id, default)
+
+
+def worker(store, session_ids: list, operations: int, seed: int):
+    """ Run the operation mix on store
+    """
+    rand = random.Random(seed)
+    for _ in range(operations):
+        roll = rand.random()
+        if roll < 0.95:
+            store.get(rand.choice(session_ids))
+        elif roll < 0.99:
+            store.create(str(uuid.uuid4()), "user")
+        else:
+            store.pop(rand.choice(session_ids))
+
+
+def throughput(factory, threads: int, operations: int) -> float:
+    """ Operations per second of threads workers on a fresh store
+    """
+    store = factory()
+    session_ids = [str(uuid.uuid4()) for _ in range(10000)]
+    for session_id in session_ids:
+        store.create(session_id, "user")
+    workers = [threading.Thread(target=worker,
+                                args=(store, session_ids, operations, i))
+               for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * operations / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print("{:>8} {:>16} {:>16}".format("threads", "global lock/s",
+                                       "striped/s"))
+    for threads in (1, 2, 4, 8, 16):
+        print("{:>8} {:>16.0f} {:>16.0f}".format(
+            threads, throughput(GlobalLockStore, threads, operations),
+            throughput(SessionStore, threads, operations)))
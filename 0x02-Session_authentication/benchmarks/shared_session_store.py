@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+""" Lookup latency of the SQLite session store shared by processes
+
+Worker processes look up random sessions in one SQLiteSessionStore
+database, read-only and then with 1% of the operations creating a
+session, which drops the read cache of every other process.
+
+    $ python3 -m benchmarks.shared_session_store [lookups per process]
+"""
+from datetime import datetime
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+from api.v1.auth.session_store import SQLiteSessionStore
+
+
+def worker(db_path: str, session_ids: list, lookups: int, write_ratio: float,
+           seed: int, results):
+    """ Time each lookup of a process
+    """
+    store = SQLiteSessionStore(db_path)
+    rand = random.Random(seed)
+    latencies = []
+    missing = 0
+    for _ in range(lookups):
+        if rand.random() < write_ratio:
+            store.create(str(uuid.uuid4()), {"user_id": "user",
+                                             "created_at": datetime.now()})
+        start = time.perf_counter()
+        value = store.get(rand.choice(session_ids))
+        latencies.append(time.perf_counter() - start)
+        missing += value is None
+    results.put((latencies, missing))
+
+
+def run(db_path: str, session_ids: list, processes: int, lookups: int,
+        write_ratio: float) -> tuple:
+    """ Latencies of every lookup of processes workers, and the number of
+    sessions not found
+    """
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(
+        target=worker,
+        args=(db_path, session_ids, lookups, write_ratio, i, results))
+        for i in range(processes)]
+    for process in workers:
+        process.start()
+    latencies = []
+    missing = 0
+    for _ in workers:
+        process_latencies, process_missing = results.get()
+        latencies.extend(process_latencies)
+        missing += process_missing
+    for process in workers:
+        process.join()
+    latencies.sort()
+    return latencies, missing
+
+
+def percentile(values: list, ratio: float) -> float:
+    """ Value at ratio of sorted values, in microseconds
+    """
+    return values[min(len(values) - 1, int(len(values) * ratio))] * 1e6
+
+
+if __name__ == "__main__":
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "sessions.sqlite3")
+        store = SQLiteSessionStore(db_path)
+        # sessions created by this process, looked up by the others
+        session_ids = [str(uuid.uuid4()) for _ in range(1000)]
+        for session_id in session_ids:
+            store.create(session_id, {"user_id": "user",
+                                      "created_at": datetime.now()})
+        print("{:>9} {:>7} {:>9} {:>9} {:>9}".format(
+            "processes", "writes", "p50 us", "p99 us", "missing"))
+        for write_ratio in (0, 0.01):
+            for processes in (1, 2, 4, 8):
+                latencies, missing = run(db_path, session_ids, processes,
+                                         lookups, write_ratio)
+                print("{:>9} {:>7.0%} {:>9.1f} {:>9.1f} {:>9}".format(
+                    processes, write_ratio, percentile(latencies, 0.5),
+                    percentile(latencies, 0.99), missing))
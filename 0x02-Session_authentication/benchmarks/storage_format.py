@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+""" JSON vs binary snapshot files
+
+Times saving count users in each format, parsing the file back into
+records and building the User objects, and compares the file sizes.
+
+    $ python3 -m benchmarks.storage_format [count]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from models.engine import binary_format
+from models.engine.file_storage import _iter_json_object
+from models.user import User
+
+
+def timed(function, *args):
+    """ Result and duration of function(*args)
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def save_json(users: list, file_path: str):
+    """ Write users like FileStorage does in JSON format
+    """
+    objs_json = {user.id: user.to_json(True) for user in users}
+    with open(file_path, 'wb') as f:
+        f.write(json.dumps(objs_json).encode())
+
+
+def parse_json(file_path: str) -> list:
+    """ Read records like FileStorage does in JSON format
+    """
+    with open(file_path, 'r') as f:
+        return [obj_json for _, obj_json in _iter_json_object(f)]
+
+
+def save_binary(users: list, file_path: str):
+    """ Write users like FileStorage does in binary format
+    """
+    with open(file_path, 'wb') as f:
+        f.write(binary_format.encode(User, users))
+
+
+def parse_binary(file_path: str) -> list:
+    """ Read records like FileStorage does in binary format
+    """
+    with open(file_path, 'rb') as f:
+        return binary_format.decode(f.read())
+
+
+def build(records: list) -> list:
+    """ User objects of parsed records
+    """
+    return [User(**obj_json) for obj_json in records]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    users = []
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i),
+                    first_name="First{}".format(i % 500),
+                    last_name="Last{}".format(i % 700))
+        user.password = "pwd{}".format(i)
+        users.append(user)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, save, parse in (('json', save_json, parse_json),
+                                  ('binary', save_binary, parse_binary)):
+            file_path = os.path.join(tmp, "users." + name)
+            _, save_time = timed(save, users, file_path)
+            records, parse_time = timed(parse, file_path)
+            loaded, build_time = timed(build, records)
+            assert [u.to_json(True) for u in loaded] == \
+                [u.to_json(True) for u in users]
+            results[name] = (save_time, parse_time, build_time,
+                             os.path.getsize(file_path))
+
+    print("users: {}".format(count))
+    print("{:8} {:>10} {:>10} {:>10} {:>12}".format(
+        "format", "save (s)", "parse (s)", "build (s)", "size (B)"))
+    for name, (save_time, parse_time, build_time, size) in results.items():
+        print("{:8} {:10.3f} {:10.3f} {:10.3f} {:12}".format(
+            name, save_time, parse_time, build_time, size))
+    json_res, bin_res = results['json'], results['binary']
+    print("binary: save x{:.1f}, parse x{:.1f}, load x{:.1f}, "
+          "size {:.0%} of JSON".format(
+              json_res[0] / bin_res[0], json_res[1] / bin_res[1],
+              (json_res[1] + json_res[2]) / (bin_res[1] + bin_res[2]),
+              bin_res[3] / json_res[3]))
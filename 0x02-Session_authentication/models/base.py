@@ -3,37 +3,98 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
-import json
+from os import getenv
+import atexit
+import calendar
+import time
 import uuid
 
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+
+# STORAGE_TYPE selects where objects live: "file" (default) keeps them
+# in memory and in .db_{Class}.json files, "sqlite" in an SQLite database
+STORAGE_TYPE = getenv('STORAGE_TYPE', 'file')
+if STORAGE_TYPE == "sqlite":
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage()
+else:
+    from models.engine.file_storage import FileStorage
+    storage = FileStorage()
+
+
+def _to_epoch(value) -> int:
+    """ Epoch seconds of a naive UTC datetime or TIMESTAMP_FORMAT string
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return calendar.timegm(value.timetuple())
+    return int(value)
 
 
 class Base():
     """ Base class
     """
 
+    # attributes the storage indexes for search()
+    indexed_attributes = ()
+    # whether to_json() results are kept until the object changes
+    cache_json = True
+
+    # Instances keep their fields in slots rather than a __dict__, and
+    # timestamps as epoch seconds converted only when read or serialized.
+    # _json_cache holds the last (public, serialized) to_json() results
+    # until any attribute is assigned.
+    __slots__ = ('id', '_created_at', '_updated_at', '_json_cache')
+    # serialized name of each slot, in serialization order
+    _fields = (('id', 'id'), ('created_at', '_created_at'),
+               ('updated_at', '_updated_at'))
+
+    def __init_subclass__(cls, **kwargs):
+        """ Append the slots of a subclass to its serialized fields
+        """
+        super().__init_subclass__(**kwargs)
+        cls._fields = cls._fields + tuple(
+            (slot, slot) for slot in cls.__dict__.get('__slots__', ()))
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
-        s_class = str(self.__class__.__name__)
-        if DATA.get(s_class) is None:
-            DATA[s_class] = {}
-
         self.id = kwargs.get('id', str(uuid.uuid4()))
+        now = int(time.time())
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self._created_at = _to_epoch(kwargs.get('created_at'))
         else:
-            self.created_at = datetime.utcnow()
+            self._created_at = now
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self._updated_at = _to_epoch(kwargs.get('updated_at'))
         else:
-            self.updated_at = datetime.utcnow()
+            self._updated_at = now
+
+    @property
+    def created_at(self) -> datetime:
+        """ Creation time as a naive UTC datetime
+        """
+        return datetime.utcfromtimestamp(self._created_at)
+
+    @created_at.setter
+    def created_at(self, value):
+        """ Set the creation time from a datetime, string or epoch
+        """
+        self._created_at = _to_epoch(value)
+
+    @property
+    def updated_at(self) -> datetime:
+        """ Last update time as a naive UTC datetime
+        """
+        return datetime.utcfromtimestamp(self._updated_at)
+
+    @updated_at.setter
+    def updated_at(self, value):
+        """ Set the last update time from a datetime, string or epoch
+        """
+        self._updated_at = _to_epoch(value)
 
     def __eq__(self, other: TypeVar('Base')) -> bool:
         """ Equality
@@ -44,13 +105,40 @@ class Base():
             return False
         return (self.id == other.id)
 
+    def __setattr__(self, name: str, value):
+        """ Set an attribute, dropping the cached to_json() results
+        """
+        object.__setattr__(self, name, value)
+        if name != '_json_cache':
+            object.__setattr__(self, '_json_cache', None)
+
     def to_json(self, for_serialization: bool = False) -> dict:
         """ Convert the object a JSON dictionary
         """
+        cache = getattr(self, '_json_cache', None)
+        if cache is None:
+            result = self._serialize()
+            cache = ({key: value for key, value in result.items()
+                      if key[0] != '_'}, result)
+            if self.cache_json:
+                self._json_cache = cache
+        # a copy, so callers can't alter the cache
+        return dict(cache[1] if for_serialization else cache[0])
+
+    def _serialize(self) -> dict:
+        """ Serialized form of every attribute, private ones included
+        """
         result = {}
-        for key, value in self.__dict__.items():
-            if not for_serialization and key[0] == '_':
+        for key, slot in self._fields:
+            try:
+                value = getattr(self, slot)
+            except AttributeError:
                 continue
+            if key != slot:
+                value = time.strftime(TIMESTAMP_FORMAT, time.gmtime(value))
+            result[key] = value
+        # subclasses without __slots__ still carry a __dict__
+        for key, value in getattr(self, '__dict__', {}).items():
             if type(value) is datetime:
                 result[key] = value.strftime(TIMESTAMP_FORMAT)
             else:
@@ -58,55 +146,64 @@ class Base():
         return result
 
     @classmethod
-    def load_from_file(cls):
+    def load_from_file(cls, lazy: bool = None):
         """ Load all objects from file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        storage.load(cls, lazy)
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    def refresh(cls):
+        """ Reload the objects only if their file changed since the last
+        load, reading just the new records when possible
+        """
+        storage.refresh(cls)
+
+    @classmethod
+    def load_stats(cls) -> dict:
+        """ Duration and memory figures of the last load_from_file()
+        """
+        return storage.load_stats(cls)
 
     @classmethod
     def save_to_file(cls):
         """ Save all objects to file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
+        storage.save_all(cls)
 
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+    @classmethod
+    def compact(cls):
+        """ Reclaim the space left by past writes
+        """
+        storage.compact(cls)
 
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        storage.save(self)
 
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        storage.remove(self)
+
+    @staticmethod
+    def flush():
+        """ Write every change queued by transactions or write-behind
+        """
+        storage.flush()
+
+    @staticmethod
+    def transaction():
+        """ Group the saves and removes of a with block into one write
+        """
+        return storage.transaction()
 
     @classmethod
     def count(cls) -> int:
         """ Count all objects
         """
-        s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return storage.count(cls)
 
     @classmethod
     def all(cls) -> Iterable[TypeVar('Base')]:
@@ -114,25 +211,35 @@ class Base():
         """
         return cls.search()
 
+    @classmethod
+    def page(cls, limit: int, cursor: str = None) -> tuple:
+        """ Return up to limit objects ordered by ID, after the cursor ID,
+        and the cursor of the next page or None
+        """
+        return storage.page(cls, limit, cursor)
+
+    @classmethod
+    def iterate(cls, batch_size: int = 500) -> Iterable[TypeVar('Base')]:
+        """ Yield all objects ordered by ID, one page at a time
+        """
+        objs, cursor = cls.page(batch_size)
+        while True:
+            yield from objs
+            if cursor is None:
+                return
+            objs, cursor = cls.page(batch_size, cursor)
+
     @classmethod
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return storage.get(cls, id)
 
     @classmethod
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
-        s_class = cls.__name__
+        return storage.search(cls, attributes)
 
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
 
-        return list(filter(_search, DATA[s_class].values()))
+atexit.register(storage.flush)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+""" Binary snapshot format of the model files
+
+Layout, little-endian, stored column by column:
+
+    magic "MDBF", version (H), record count (I), field count (H)
+    per field:  name length (H), name (UTF-8), kind (B)
+    per field, one column of count values:
+      KIND_TIMESTAMP: epoch seconds (q each), NULL_TIMESTAMP for None
+      KIND_STR:       lengths in characters (i each, -1 for None),
+                      then byte size (Q) and the UTF-8 of all values
+      KIND_JSON:      same as KIND_STR, each value JSON encoded
+
+Fixed-width and length-prefixed columns are decoded in bulk, so loading
+needs neither a JSON parse nor a timestamp parse per record.
+"""
+from array import array
+from datetime import datetime
+from typing import List, Iterable
+import calendar
+import json
+import struct
+import sys
+
+
+MAGIC = b"MDBF"
+VERSION = 1
+KIND_STR = 0
+KIND_TIMESTAMP = 1
+KIND_JSON = 2
+NULL_TIMESTAMP = -(1 << 63)
+
+_HEADER = struct.Struct("<4sHIH")
+_FIELD = struct.Struct("<H")
+_KIND = struct.Struct("<B")
+_SIZE = struct.Struct("<Q")
+
+
+def _epoch(value) -> int:
+    """ Epoch seconds of a TIMESTAMP_FORMAT string or a number
+    """
+    if value is None:
+        return NULL_TIMESTAMP
+    if isinstance(value, str):
+        return calendar.timegm(datetime.fromisoformat(value).timetuple())
+    return int(value)
+
+
+def _column_bytes(values: array) -> bytes:
+    """ Little-endian bytes of an array
+    """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _column_array(typecode: str, data: bytes) -> array:
+    """ Array read from little-endian bytes
+    """
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def encode(cls, items: Iterable) -> bytes:
+    """ Serialize objects of cls, or raw records of it, to the format
+    """
+    items = list(items)
+    # model fields first, then any extra key of the raw records
+    fields = [(key, KIND_TIMESTAMP if key != slot else KIND_STR)
+              for key, slot in cls._fields]
+    known = {key for key, _ in fields}
+    columns = {key: [] for key in known}
+    for item in items:
+        if isinstance(item, dict):
+            for key in item:
+                if key not in known:
+                    known.add(key)
+                    fields.append((key, KIND_STR))
+                    columns[key] = [None] * (len(columns['id']))
+            for key, kind in fields:
+                columns[key].append(item.get(key))
+        else:
+            extra = getattr(item, '__dict__', {})
+            for key, slot in cls._fields:
+                columns[key].append(getattr(item, slot, None))
+            for key, kind in fields[len(cls._fields):]:
+                columns[key].append(extra.get(key))
+
+    chunks = [_HEADER.pack(MAGIC, VERSION, len(items), len(fields))]
+    for i, (key, kind) in enumerate(fields):
+        if kind == KIND_STR and not all(
+                v is None or type(v) is str for v in columns[key]):
+            kind = KIND_JSON
+            fields[i] = (key, kind)
+        name = key.encode()
+        chunks.append(_FIELD.pack(len(name)) + name + _KIND.pack(kind))
+    for key, kind in fields:
+        values = columns[key]
+        if kind == KIND_TIMESTAMP:
+            chunks.append(_column_bytes(array('q', map(_epoch, values))))
+            continue
+        if kind == KIND_JSON:
+            values = [None if v is None else json.dumps(v) for v in values]
+        lengths = array('i', (-1 if v is None else len(v) for v in values))
+        blob = "".join(v for v in values if v is not None).encode()
+        chunks.append(_column_bytes(lengths))
+        chunks.append(_SIZE.pack(len(blob)))
+        chunks.append(blob)
+    return b"".join(chunks)
+
+
+def decode(data: bytes) -> List[dict]:
+    """ Records of a binary snapshot, timestamps as epoch seconds
+    """
+    magic, version, count, n_fields = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary model file")
+    if version != VERSION:
+        raise ValueError("Unsupported binary format version {}".format(
+            version))
+    pos = _HEADER.size
+    fields = []
+    for _ in range(n_fields):
+        size, = _FIELD.unpack_from(data, pos)
+        pos += _FIELD.size
+        name = data[pos:pos + size].decode()
+        pos += size
+        kind, = _KIND.unpack_from(data, pos)
+        pos += _KIND.size
+        fields.append((name, kind))
+
+    columns = []
+    for name, kind in fields:
+        if kind == KIND_TIMESTAMP:
+            end = pos + 8 * count
+            values = [None if v == NULL_TIMESTAMP else v
+                      for v in _column_array('q', data[pos:end])]
+            pos = end
+            columns.append(values)
+            continue
+        end = pos + 4 * count
+        lengths = _column_array('i', data[pos:end])
+        size, = _SIZE.unpack_from(data, end)
+        pos = end + _SIZE.size
+        text = data[pos:pos + size].decode()
+        pos += size
+        values = []
+        offset = 0
+        for length in lengths:
+            if length < 0:
+                values.append(None)
+                continue
+            values.append(text[offset:offset + length])
+            offset += length
+        if kind == KIND_JSON:
+            values = [None if v is None else json.loads(v) for v in values]
+        columns.append(values)
+
+    names = [name for name, _ in fields]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _model_classes() -> dict:
+    """ Model classes by name
+    """
+    from models.user import User
+    from models.user_session import UserSession
+    return {'User': User, 'UserSession': UserSession}
+
+
+def to_binary(cls, json_path: str, binary_path: str) -> int:
+    """ Convert a .db_{Class}.json file to the binary format
+    """
+    from models.engine.file_storage import _iter_json_object
+    with open(json_path, 'r') as f:
+        objs = [cls(**obj_json) for _, obj_json in _iter_json_object(f)]
+    with open(binary_path, 'wb') as f:
+        f.write(encode(cls, objs))
+    return len(objs)
+
+
+def to_json(cls, binary_path: str, json_path: str) -> int:
+    """ Convert a binary file back to the .db_{Class}.json format
+    """
+    with open(binary_path, 'rb') as f:
+        records = decode(f.read())
+    objs_json = {}
+    for record in records:
+        obj = cls(**record)
+        objs_json[obj.id] = obj.to_json(True)
+    with open(json_path, 'w') as f:
+        json.dump(objs_json, f)
+    return len(objs_json)
+
+
+if __name__ == "__main__":
+    usage = "usage: python3 -m models.engine.binary_format " \
+            "to-binary|to-json Class [source] [destination]"
+    if len(sys.argv) < 3 or sys.argv[1] not in ('to-binary', 'to-json') \
+            or sys.argv[2] not in _model_classes():
+        sys.exit(usage)
+    model = _model_classes()[sys.argv[2]]
+    json_file = ".db_{}.json".format(model.__name__)
+    binary_file = ".db_{}.bin".format(model.__name__)
+    if sys.argv[1] == 'to-binary':
+        convert, paths = to_binary, [json_file, binary_file]
+    else:
+        convert, paths = to_json, [binary_file, json_file]
+    paths[:len(sys.argv[3:5])] = sys.argv[3:5]
+    n = convert(model, *paths)
+    print("{} {} records: {} -> {}".format(n, model.__name__, *paths))
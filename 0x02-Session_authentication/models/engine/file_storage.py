@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+""" FileStorage module: one JSON file per class
+"""
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from typing import TypeVar, List, Iterable
+from os import getenv, path
+import json
+import os
+import threading
+import time
+import tracemalloc
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from models.engine import binary_format
+from models.engine.storage import Storage
+
+
+# STORAGE_MODE=journal appends one record per save/remove to
+# .db_{Class}.journal instead of rewriting .db_{Class}.json each time;
+# the journal is folded back into the snapshot in a background thread
+# once it holds JOURNAL_COMPACT_THRESHOLD records.
+JOURNAL_MODE = getenv('STORAGE_MODE', 'snapshot') == 'journal'
+try:
+    JOURNAL_COMPACT_THRESHOLD = int(getenv('JOURNAL_COMPACT_THRESHOLD',
+                                           '1000'))
+except ValueError:
+    JOURNAL_COMPACT_THRESHOLD = 1000
+
+# LAZY_LOAD=1 keeps the records read by load() as plain dicts and only
+# builds the model instance the first time it is needed.
+LAZY_LOAD = getenv('LAZY_LOAD', '0') == '1'
+
+# STORAGE_WRITE_BEHIND=1 makes save()/remove() only mark their class
+# dirty; a background thread then writes every dirty class once per
+# STORAGE_FLUSH_INTERVAL seconds. STORAGE_FSYNC=1 fsyncs each write.
+WRITE_BEHIND = getenv('STORAGE_WRITE_BEHIND', '0') == '1'
+try:
+    FLUSH_INTERVAL = float(getenv('STORAGE_FLUSH_INTERVAL', '1'))
+except ValueError:
+    FLUSH_INTERVAL = 1.0
+FSYNC = getenv('STORAGE_FSYNC', '0') == '1'
+
+# STORAGE_FORMAT=binary writes snapshots as .db_{Class}.bin in the
+# format of models.engine.binary_format instead of JSON
+BINARY_FORMAT = getenv('STORAGE_FORMAT', 'json') == 'binary'
+
+
+def _json_path(s_class: str) -> str:
+    """ JSON snapshot file of a class
+    """
+    return ".db_{}.json".format(s_class)
+
+
+def _file_path(s_class: str) -> str:
+    """ Snapshot file of a class in the configured format
+    """
+    if BINARY_FORMAT:
+        return ".db_{}.bin".format(s_class)
+    return _json_path(s_class)
+
+
+def _journal_path(s_class: str, rotated: bool = False) -> str:
+    """ Journal file of a class, or the one being compacted
+    """
+    if rotated:
+        return ".db_{}.journal.old".format(s_class)
+    return ".db_{}.journal".format(s_class)
+
+
+def _stat(file_path: str) -> tuple:
+    """ (inode, mtime, size) of a file, None if it doesn't exist
+    """
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _fstat(f) -> tuple:
+    """ (inode, mtime, size) of an open file
+    """
+    st = os.fstat(f.fileno())
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+# characters that can continue a JSON number
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+def _iter_json_object(f, chunk_size: int = 1 << 16) -> Iterable[tuple]:
+    """ Yield the (key, value) pairs of a top-level JSON object
+    read from f one chunk at a time
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+
+    def _more() -> bool:
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def _token() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\n\r':
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not _more():
+                return ''
+
+    def _value():
+        nonlocal pos
+        while True:
+            _token()
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # a value ending with the buffer, or a number followed
+                # by what may be more of it, may be cut short
+                if eof or (end < len(buf) and
+                           buf[end] not in _NUMBER_CHARS):
+                    pos = end
+                    return value
+            except ValueError:
+                if eof:
+                    raise
+            _more()
+
+    if _token() != '{':
+        raise ValueError("Expecting a JSON object")
+    pos += 1
+    if _token() == '}':
+        return
+    while True:
+        key = _value()
+        if _token() != ':':
+            raise ValueError("Expecting ':' delimiter")
+        pos += 1
+        yield key, _value()
+        token = _token()
+        pos += 1
+        if token == '}':
+            return
+        if token != ',':
+            raise ValueError("Expecting ',' delimiter")
+
+
+def _write_snapshot(s_class: str, data: bytes):
+    """ Atomically replace the snapshot file of a class
+    """
+    file_path = _file_path(s_class)
+    tmp_path = "{}.tmp".format(file_path)
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        if FSYNC:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+class FileStorage(Storage):
+    """ Keeps every object in memory and persists each class to
+    .db_{Class}.json, optionally through an append-only journal
+    """
+
+    def __init__(self):
+        """ Initialize an empty store
+        """
+        self.__objects = {}
+        # records of a lazy load not turned into instances yet
+        self.__raw = {}
+        # indexes[s_class][attribute][value] holds the ids of the saved
+        # objects with that value; indexed_values[s_class][id] remembers
+        # what each object was indexed under so a later save() can drop
+        # the stale entries
+        self.__indexes = {}
+        self.__indexed_values = {}
+        # ids of each class kept sorted, the stable order of page()
+        self.__order = {}
+        self.__load_stats = {}
+        # files[s_class] describes the files as last read or written by
+        # this process: 'snapshot' and 'rotated' hold _stat() results,
+        # 'journal' the (inode, offset) of the journal read so far
+        self.__files = {}
+        self.__journal_size = {}
+        self.__compacting = set()
+        self.__locks = {}
+        self.__compact_locks = {}
+        # pending[s_class] = (class, journal records not written yet)
+        self.__pending = {}
+        self.__pending_lock = threading.Lock()
+        self.__flush_lock = threading.Lock()
+        self.__transactions = threading.local()
+        self.__flusher = None
+
+    def _lock(self, s_class: str) -> threading.RLock:
+        """ Lock guarding the objects and the files of one class
+        """
+        return self.__locks.setdefault(s_class, threading.RLock())
+
+    def _objects(self, s_class: str) -> dict:
+        """ Materialized objects of a class by id
+        """
+        return self.__objects.setdefault(s_class, {})
+
+    def load(self, cls, lazy: bool = None):
+        """ Load all objects from file
+        """
+        self.flush()
+        self._load(cls, lazy)
+
+    def _load(self, cls, lazy: bool = None):
+        """ Load all objects from file, leaving queued changes queued
+        """
+        s_class = cls.__name__
+        file_path = _file_path(s_class)
+        if lazy is None:
+            lazy = LAZY_LOAD
+        start = time.perf_counter()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        with self._lock(s_class):
+            objects = self.__objects[s_class] = {}
+            raw = self.__raw[s_class] = {}
+            files = {'snapshot': None, 'rotated': None, 'journal': (None, 0)}
+            if path.exists(file_path) and BINARY_FORMAT:
+                with open(file_path, 'rb') as f:
+                    files['snapshot'] = _fstat(f)
+                    for obj_json in binary_format.decode(f.read()):
+                        if lazy:
+                            raw[obj_json['id']] = obj_json
+                        else:
+                            objects[obj_json['id']] = cls(**obj_json)
+            elif path.exists(file_path):
+                with open(file_path, 'r') as f:
+                    files['snapshot'] = _fstat(f)
+                    for obj_id, obj_json in _iter_json_object(f):
+                        if lazy:
+                            raw[obj_id] = obj_json
+                        else:
+                            objects[obj_id] = cls(**obj_json)
+            if JOURNAL_MODE:
+                self.__journal_size[s_class] = self._replay_journal(
+                    cls, files, lazy)
+            self.__files[s_class] = files
+            self._reindex(cls)
+        stats = {
+            'objects': len(objects) + len(raw),
+            'lazy': lazy,
+            'seconds': time.perf_counter() - start,
+        }
+        if tracemalloc.is_tracing():
+            stats['peak_traced_bytes'] = tracemalloc.get_traced_memory()[1]
+        if resource is not None:
+            # kilobytes on Linux
+            stats['peak_rss'] = resource.getrusage(
+                resource.RUSAGE_SELF).ru_maxrss
+        self.__load_stats[s_class] = stats
+
+    def load_stats(self, cls) -> dict:
+        """ Duration and memory figures of the last load()
+        """
+        return self.__load_stats.get(cls.__name__, {})
+
+    def _materialize(self, cls, obj_id: str) -> TypeVar('Base'):
+        """ Build the instance of a record left raw by a lazy load
+        """
+        s_class = cls.__name__
+        with self._lock(s_class):
+            obj = self._objects(s_class).get(obj_id)
+            if obj is None:
+                obj_json = self.__raw.get(s_class, {}).pop(obj_id, None)
+                if obj_json is not None:
+                    obj = cls(**obj_json)
+                    self._objects(s_class)[obj_id] = obj
+            return obj
+
+    def _materialize_all(self, cls):
+        """ Build the instances of every raw record
+        """
+        s_class = cls.__name__
+        if not self.__raw.get(s_class):
+            return
+        with self._lock(s_class):
+            for obj_id in list(self.__raw[s_class].keys()):
+                self._materialize(cls, obj_id)
+
+    def _reindex(self, cls):
+        """ Rebuild the hash indexes of a class
+        """
+        s_class = cls.__name__
+        self.__order[s_class] = sorted(
+            set(self._objects(s_class)) | set(self.__raw.get(s_class, {})))
+        self.__indexes[s_class] = {attr: {}
+                                   for attr in cls.indexed_attributes}
+        self.__indexed_values[s_class] = {}
+        for obj_id, obj in self._objects(s_class).items():
+            self._index_add(cls, obj_id,
+                            lambda attr: getattr(obj, attr, None))
+        for obj_id, obj_json in self.__raw.get(s_class, {}).items():
+            self._index_add(cls, obj_id, obj_json.get)
+
+    def _index_add(self, cls, obj_id: str, lookup):
+        """ Register an object id in the indexes of its class, reading
+        the indexed values through lookup(attribute)
+        """
+        s_class = cls.__name__
+        indexes = self.__indexes.setdefault(s_class, {})
+        values = {}
+        for attr in cls.indexed_attributes:
+            value = lookup(attr)
+            try:
+                indexes.setdefault(attr, {}).setdefault(value, {})[
+                    obj_id] = None
+            except TypeError:
+                # unhashable values are only found by a full scan
+                continue
+            values[attr] = value
+        self.__indexed_values.setdefault(s_class, {})[obj_id] = values
+
+    def _index_remove(self, cls, obj_id: str):
+        """ Drop an object id from the indexes of its class
+        """
+        s_class = cls.__name__
+        values = self.__indexed_values.get(s_class, {}).pop(obj_id, None)
+        if values is None:
+            return
+        for attr, value in values.items():
+            ids = self.__indexes[s_class][attr].get(value)
+            if ids is None:
+                continue
+            ids.pop(obj_id, None)
+            if len(ids) == 0:
+                del self.__indexes[s_class][attr][value]
+
+    def _replay_journal(self, cls, files: dict, lazy: bool = False) -> int:
+        """ Apply journal records on top of the loaded snapshot, noting
+        in files how far the journals were read
+        """
+        s_class = cls.__name__
+        objects = self._objects(s_class)
+        raw = self.__raw.setdefault(s_class, {})
+        count = 0
+        for journal_path in (_journal_path(s_class, True),
+                             _journal_path(s_class)):
+            if not path.exists(journal_path):
+                continue
+            with open(journal_path, 'rb') as f:
+                if journal_path == _journal_path(s_class):
+                    files['journal'] = (_fstat(f)[0], 0)
+                else:
+                    files['rotated'] = _fstat(f)
+                offset = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # append still in progress, or torn by a crash
+                        break
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # torn last line of an interrupted append
+                        continue
+                    if record.get('op') == 'save':
+                        obj_json = record.get('obj')
+                        if lazy:
+                            raw[obj_json['id']] = obj_json
+                        else:
+                            objects[obj_json['id']] = cls(**obj_json)
+                    elif record.get('op') == 'remove':
+                        objects.pop(record.get('id'), None)
+                        raw.pop(record.get('id'), None)
+                    count += 1
+                if journal_path == _journal_path(s_class):
+                    files['journal'] = (files['journal'][0], offset)
+        return count
+
+    def refresh(self, cls):
+        """ Bring the objects of a class up to date with its files,
+        reading only the new journal records when possible
+        """
+        s_class = cls.__name__
+        with self._lock(s_class):
+            if not self._files_unchanged(s_class):
+                reload = True
+            elif JOURNAL_MODE:
+                reload = not self._read_journal_delta(cls)
+            else:
+                reload = False
+        if reload:
+            self.load(cls)
+
+    def _files_unchanged(self, s_class: str) -> bool:
+        """ Whether the snapshot, and the journal being compacted, are
+        still the ones last read or written by this process
+        """
+        files = self.__files.get(s_class)
+        if files is None:
+            return False
+        if _stat(_file_path(s_class)) != files['snapshot']:
+            return False
+        if JOURNAL_MODE and \
+                _stat(_journal_path(s_class, True)) != files['rotated']:
+            return False
+        return True
+
+    def _read_journal_delta(self, cls) -> bool:
+        """ Apply the records appended to the journal since it was last
+        read; False if the journal was replaced and needs a full load
+        """
+        s_class = cls.__name__
+        ino, offset = self.__files[s_class]['journal']
+        try:
+            f = open(_journal_path(s_class), 'rb')
+        except OSError:
+            return offset == 0
+        with f:
+            st = os.fstat(f.fileno())
+            if (ino is not None and st.st_ino != ino) or \
+                    st.st_size < offset:
+                return False
+            if st.st_size == offset:
+                return True
+            f.seek(offset)
+            data = f.read()
+        # leave an incomplete last line for the next refresh
+        data = data[:data.rfind(b"\n") + 1]
+        self.__files[s_class]['journal'] = (st.st_ino, offset + len(data))
+        for line in data.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('op') == 'save':
+                self._put(cls(**record.get('obj')))
+            elif record.get('op') == 'remove':
+                self._drop(cls, record.get('id'))
+            self.__journal_size[s_class] = \
+                self.__journal_size.get(s_class, 0) + 1
+        return True
+
+    def save_all(self, cls):
+        """ Save all objects to file
+        """
+        if JOURNAL_MODE:
+            self.compact(cls)
+            return
+        s_class = cls.__name__
+        with self._lock(s_class):
+            _write_snapshot(s_class, self._snapshot(cls))
+            if s_class in self.__files:
+                self.__files[s_class]['snapshot'] = _stat(_file_path(s_class))
+
+    def _snapshot(self, cls) -> bytes:
+        """ Snapshot file content of every object, raw records included
+        """
+        s_class = cls.__name__
+        if BINARY_FORMAT:
+            return binary_format.encode(
+                cls, list(self.__raw.get(s_class, {}).values()) +
+                list(self._objects(s_class).values()))
+        objs_json = dict(self.__raw.get(s_class, {}))
+        for obj_id, obj in self._objects(s_class).items():
+            objs_json[obj_id] = obj.to_json(True)
+        return json.dumps(objs_json).encode()
+
+    def _append_journal(self, cls, records: List[dict]):
+        """ Append records to the journal, compacting when it grows
+        """
+        s_class = cls.__name__
+        data = "".join(json.dumps(record) + "\n"
+                       for record in records).encode()
+        with self._lock(s_class):
+            with open(_journal_path(s_class), 'ab') as f:
+                f.write(data)
+                f.flush()
+                if FSYNC:
+                    os.fsync(f.fileno())
+                st = os.fstat(f.fileno())
+            files = self.__files.get(s_class)
+            if files is not None:
+                # skip our own records on the next refresh, unless
+                # another process appended in between
+                ino, offset = files['journal']
+                if ino in (None, st.st_ino) and \
+                        st.st_size - len(data) == offset:
+                    files['journal'] = (st.st_ino, st.st_size)
+            size = self.__journal_size.get(s_class, 0) + len(records)
+            self.__journal_size[s_class] = size
+            if size < JOURNAL_COMPACT_THRESHOLD or \
+                    s_class in self.__compacting:
+                return
+            self.__compacting.add(s_class)
+        threading.Thread(target=self.compact, args=(cls,),
+                         daemon=True).start()
+
+    def compact(self, cls):
+        """ Fold the journal into a new snapshot file
+        """
+        s_class = cls.__name__
+        journal_path = _journal_path(s_class)
+        rotated_path = _journal_path(s_class, True)
+        compact_lock = self.__compact_locks.setdefault(s_class,
+                                                       threading.Lock())
+        with compact_lock:
+            try:
+                with self._lock(s_class):
+                    # records appended by other processes since the last
+                    # read would be lost with the rotated journal
+                    if s_class in self.__files and \
+                            not (self._files_unchanged(s_class) and
+                                 self._read_journal_delta(cls)):
+                        self._load(cls)
+                    if path.exists(journal_path):
+                        if path.exists(rotated_path):
+                            # left over by an interrupted compaction
+                            with open(journal_path, 'r') as src, \
+                                    open(rotated_path, 'a') as dst:
+                                dst.write(src.read())
+                            os.remove(journal_path)
+                        else:
+                            os.replace(journal_path, rotated_path)
+                    data = self._snapshot(cls)
+                    self.__journal_size[s_class] = 0
+                    files = self.__files.get(s_class)
+                    if files is not None:
+                        files['rotated'] = _stat(rotated_path)
+                        files['journal'] = (None, 0)
+                # records appended from now on go to a fresh journal,
+                # which is replayed after the snapshot on the next load
+                _write_snapshot(s_class, data)
+                with self._lock(s_class):
+                    if path.exists(rotated_path):
+                        os.remove(rotated_path)
+                    if files is not None:
+                        files['snapshot'] = _stat(_file_path(s_class))
+                        files['rotated'] = None
+            finally:
+                self.__compacting.discard(s_class)
+
+    def _put(self, obj: TypeVar('Base')):
+        """ Insert or replace an object in memory
+        """
+        cls = obj.__class__
+        s_class = cls.__name__
+        if obj.id not in self._objects(s_class) and \
+                obj.id not in self.__raw.get(s_class, {}):
+            insort(self.__order.setdefault(s_class, []), obj.id)
+        self._objects(s_class)[obj.id] = obj
+        self.__raw.get(s_class, {}).pop(obj.id, None)
+        self._index_remove(cls, obj.id)
+        self._index_add(cls, obj.id, lambda attr: getattr(obj, attr, None))
+
+    def _drop(self, cls, obj_id: str) -> bool:
+        """ Delete an object from memory, False if it wasn't there
+        """
+        s_class = cls.__name__
+        if obj_id not in self._objects(s_class) and \
+                obj_id not in self.__raw.get(s_class, {}):
+            return False
+        self._objects(s_class).pop(obj_id, None)
+        self.__raw.get(s_class, {}).pop(obj_id, None)
+        order = self.__order[s_class]
+        del order[bisect_left(order, obj_id)]
+        self._index_remove(cls, obj_id)
+        return True
+
+    def save(self, obj: TypeVar('Base')):
+        """ Save one object
+        """
+        cls = obj.__class__
+        with self._lock(cls.__name__):
+            self._put(obj)
+            self._persist(cls, {'op': 'save', 'obj': obj.to_json(True)})
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Remove one object
+        """
+        cls = obj.__class__
+        with self._lock(cls.__name__):
+            if self._drop(cls, obj.id):
+                self._persist(cls, {'op': 'remove', 'id': obj.id})
+
+    def _persist(self, cls, record: dict):
+        """ Write one change now, or queue it for the next flush when in
+        a transaction or in write-behind mode
+        """
+        depth = getattr(self.__transactions, 'depth', 0)
+        if not WRITE_BEHIND and depth == 0:
+            if JOURNAL_MODE:
+                self._append_journal(cls, [record])
+            else:
+                self.save_all(cls)
+            return
+        with self.__pending_lock:
+            self.__pending.setdefault(cls.__name__,
+                                      (cls, []))[1].append(record)
+            if WRITE_BEHIND and self.__flusher is None:
+                self.__flusher = threading.Thread(target=self._flush_loop,
+                                                  daemon=True)
+                self.__flusher.start()
+
+    def _flush_loop(self):
+        """ Write-behind loop flushing dirty classes periodically
+        """
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        """ Write every change queued by transactions or write-behind
+        """
+        with self.__flush_lock:
+            with self.__pending_lock:
+                pending = list(self.__pending.values())
+                self.__pending.clear()
+            for cls, records in pending:
+                if JOURNAL_MODE:
+                    self._append_journal(cls, records)
+                else:
+                    # the snapshot holds every queued change at once
+                    self.save_all(cls)
+
+    @contextmanager
+    def transaction(self):
+        """ Group the saves and removes of the block into one write
+        per class, issued when the outermost transaction exits
+        """
+        transactions = self.__transactions
+        transactions.depth = getattr(transactions, 'depth', 0) + 1
+        try:
+            yield
+        finally:
+            transactions.depth -= 1
+            if transactions.depth == 0 and not WRITE_BEHIND:
+                self.flush()
+
+    def count(self, cls) -> int:
+        """ Count all objects
+        """
+        s_class = cls.__name__
+        return len(self._objects(s_class)) + len(self.__raw.get(s_class,
+                                                                {}))
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        s_class = cls.__name__
+        obj = self._objects(s_class).get(id)
+        if obj is None and id in self.__raw.get(s_class, {}):
+            obj = self._materialize(cls, id)
+        return obj
+
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+        """
+        s_class = cls.__name__
+        candidates = None
+        for k, v in attributes.items():
+            if k not in cls.indexed_attributes:
+                continue
+            try:
+                ids = self.__indexes.get(s_class, {}).get(k, {}).get(v, {})
+            except TypeError:
+                continue
+            candidates = [self.get(cls, i) for i in list(ids)]
+            candidates = [obj for obj in candidates if obj is not None]
+            break
+        if candidates is None:
+            self._materialize_all(cls)
+            with self._lock(s_class):
+                candidates = list(self._objects(s_class).values())
+
+        def _search(obj):
+            if len(attributes) == 0:
+                return True
+            for k, v in attributes.items():
+                if (getattr(obj, k) != v):
+                    return False
+            return True
+
+        return list(filter(_search, candidates))
+
+    def page(self, cls, limit: int, cursor: str = None) -> tuple:
+        """ Up to limit objects in id order, after the cursor id
+        """
+        s_class = cls.__name__
+        with self._lock(s_class):
+            order = self.__order.get(s_class, [])
+            start = 0 if cursor is None else bisect_right(order, cursor)
+            ids = order[start:start + limit]
+            more = start + limit < len(order)
+        objs = [self.get(cls, i) for i in ids]
+        objs = [obj for obj in objs if obj is not None]
+        if more and len(ids) > 0:
+            return objs, ids[-1]
+        return objs, None
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+""" SQLiteStorage module: one table per class in an SQLite database
+"""
+from contextlib import contextmanager
+from typing import TypeVar, List
+from os import getenv, path
+import json
+import sqlite3
+import threading
+import time
+
+from models.engine.storage import Storage
+from models.engine.file_storage import _json_path, _iter_json_object
+
+
+DB_PATH = getenv('STORAGE_SQLITE_PATH', '.db.sqlite3')
+FSYNC = getenv('STORAGE_FSYNC', '0') == '1'
+
+
+def _column_value(value):
+    """ Value stored in an indexed column, None when SQLite can't hold it
+    """
+    if isinstance(value, (str, int, float)):
+        return value
+    return None
+
+
+class SQLiteStorage(Storage):
+    """ Stores each class in its own table: the serialized object in a
+    data column, plus one indexed column per indexed attribute
+
+    The database runs in WAL mode so several worker processes can share
+    it, with readers never blocked by a writer.
+    """
+
+    def __init__(self, db_path: str = None):
+        """ Initialize the store on db_path
+        """
+        self.__path = db_path or DB_PATH
+        # idle connections, reused by every thread
+        self.__idle = []
+        self.__idle_lock = threading.Lock()
+        # connection held by the transaction of the calling thread
+        self.__local = threading.local()
+        # statements[s_class] = SQL of each query of a class, built once
+        # so sqlite3 reuses its prepared statements
+        self.__statements = {}
+        self.__statements_lock = threading.Lock()
+        self.__load_stats = {}
+
+    def _checkout(self) -> sqlite3.Connection:
+        """ Idle connection, or a new one when all are in use
+        """
+        with self.__idle_lock:
+            if self.__idle:
+                return self.__idle.pop()
+        # autocommit; transaction() issues BEGIN/COMMIT itself
+        conn = sqlite3.connect(self.__path, timeout=30,
+                               isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous={}".format(
+            'FULL' if FSYNC else 'NORMAL'))
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection):
+        """ Give a connection back to the idle ones
+        """
+        with self.__idle_lock:
+            self.__idle.append(conn)
+
+    @contextmanager
+    def _connection(self):
+        """ Connection for the block: the one of the transaction of the
+        calling thread, or an idle one
+        """
+        conn = getattr(self.__local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def _statements(self, cls) -> dict:
+        """ SQL of the queries of a class, creating its table if needed
+        """
+        s_class = cls.__name__
+        statements = self.__statements.get(s_class)
+        if statements is not None:
+            return statements
+        columns = tuple(cls.indexed_attributes)
+        for name in (s_class,) + columns:
+            if not name.isidentifier():
+                raise ValueError("Invalid SQL name: {}".format(name))
+        with self.__statements_lock, self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS "{}" ('
+                'id TEXT PRIMARY KEY, data TEXT NOT NULL)'.format(s_class))
+            existing = {row[1] for row in conn.execute(
+                'PRAGMA table_info("{}")'.format(s_class))}
+            for column in columns:
+                if column not in existing:
+                    conn.execute('ALTER TABLE "{}" ADD COLUMN "{}"'.format(
+                        s_class, column))
+                conn.execute(
+                    'CREATE INDEX IF NOT EXISTS "ix_{0}_{1}" '
+                    'ON "{0}" ("{1}")'.format(s_class, column))
+            names = ", ".join('"{}"'.format(c) for c in columns)
+            statements = {
+                'upsert': 'INSERT OR REPLACE INTO "{}" (id, data{}) '
+                          'VALUES (?, ?{})'.format(
+                              s_class, ", " + names if names else "",
+                              ", ?" * len(columns)),
+                'delete': 'DELETE FROM "{}" WHERE id = ?'.format(s_class),
+                'get': 'SELECT data FROM "{}" WHERE id = ?'.format(s_class),
+                'count': 'SELECT COUNT(*) FROM "{}"'.format(s_class),
+                'select': 'SELECT data FROM "{}"'.format(s_class),
+                'page': 'SELECT id, data FROM "{}" WHERE id > ? '
+                        'ORDER BY id LIMIT ?'.format(s_class),
+            }
+            self.__statements[s_class] = statements
+        return statements
+
+    def load(self, cls, lazy: bool = None):
+        """ Create the table of a class, importing its JSON file the
+        first time
+        """
+        s_class = cls.__name__
+        start = time.perf_counter()
+        count = self.count(cls)
+        file_path = _json_path(s_class)
+        if count == 0 and path.exists(file_path):
+            with self.transaction(), open(file_path, 'r') as f:
+                for obj_id, obj_json in _iter_json_object(f):
+                    self.save(cls(**obj_json))
+                    count += 1
+        self.__load_stats[s_class] = {
+            'objects': count,
+            'seconds': time.perf_counter() - start,
+        }
+
+    def refresh(self, cls):
+        """ Every query already reads the committed rows
+        """
+        pass
+
+    def load_stats(self, cls) -> dict:
+        """ Duration of the last load()
+        """
+        return self.__load_stats.get(cls.__name__, {})
+
+    def save_all(self, cls):
+        """ Every write is already committed
+        """
+        pass
+
+    def compact(self, cls):
+        """ Checkpoint the WAL back into the database file
+        """
+        with self._connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or replace one object
+        """
+        cls = obj.__class__
+        params = [obj.id, json.dumps(obj.to_json(True))]
+        for attr in cls.indexed_attributes:
+            params.append(_column_value(getattr(obj, attr, None)))
+        statement = self._statements(cls)['upsert']
+        with self._connection() as conn:
+            conn.execute(statement, params)
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete one object
+        """
+        statement = self._statements(obj.__class__)['delete']
+        with self._connection() as conn:
+            conn.execute(statement, (obj.id,))
+
+    @contextmanager
+    def transaction(self):
+        """ Run the writes of the block in one SQLite transaction
+        """
+        conn = getattr(self.__local, 'conn', None)
+        if conn is not None:
+            # nested: part of the outer transaction
+            yield
+            return
+        conn = self._checkout()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            self.__local.conn = conn
+            try:
+                yield
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            self.__local.conn = None
+            self._checkin(conn)
+
+    def count(self, cls) -> int:
+        """ Count all objects
+        """
+        statement = self._statements(cls)['count']
+        with self._connection() as conn:
+            return conn.execute(statement).fetchone()[0]
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        statement = self._statements(cls)['get']
+        with self._connection() as conn:
+            row = conn.execute(statement, (id,)).fetchone()
+        if row is None:
+            return None
+        return cls(**json.loads(row[0]))
+
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes, filtering on the
+        indexed columns in SQL
+        """
+        sql = self._statements(cls)['select']
+        where = []
+        params = []
+        for k, v in attributes.items():
+            if k not in cls.indexed_attributes:
+                continue
+            if v is None:
+                where.append('"{}" IS NULL'.format(k))
+            elif _column_value(v) is not None:
+                where.append('"{}" = ?'.format(k))
+                params.append(v)
+        if where:
+            sql = "{} WHERE {}".format(sql, " AND ".join(where))
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        objs = [cls(**json.loads(row[0])) for row in rows]
+
+        # the columns only narrow the rows, the objects have the last word
+        def _search(obj):
+            for k, v in attributes.items():
+                if (getattr(obj, k) != v):
+                    return False
+            return True
+
+        return list(filter(_search, objs))
+
+    def page(self, cls, limit: int, cursor: str = None) -> tuple:
+        """ Up to limit objects in id order, after the cursor id
+        """
+        statement = self._statements(cls)['page']
+        with self._connection() as conn:
+            rows = conn.execute(
+                statement,
+                ('' if cursor is None else cursor, limit + 1)).fetchall()
+        objs = [cls(**json.loads(data)) for _, data in rows[:limit]]
+        if len(rows) > limit:
+            return objs, rows[limit - 1][0]
+        return objs, None
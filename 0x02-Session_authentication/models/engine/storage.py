@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+""" Storage module
+"""
+from typing import TypeVar, List
+
+
+class Storage():
+    """ Interface of the backends persisting Base objects
+
+    Every method receives the model class it works on; the class name
+    identifies the table and cls(**obj.to_json(True)) rebuilds an object.
+    """
+
+    def load(self, cls, lazy: bool = None):
+        """ (Re)load all objects of a class from the store
+        """
+        raise NotImplementedError()
+
+    def refresh(self, cls):
+        """ Pick up the changes made to a class by other processes since
+        it was loaded
+        """
+        self.load(cls)
+
+    def load_stats(self, cls) -> dict:
+        """ Duration and memory figures of the last load()
+        """
+        return {}
+
+    def save_all(self, cls):
+        """ Make every object of a class durable
+        """
+        raise NotImplementedError()
+
+    def compact(self, cls):
+        """ Reclaim space left by past writes of a class
+        """
+        pass
+
+    def save(self, obj: TypeVar('Base')):
+        """ Insert or replace one object
+        """
+        raise NotImplementedError()
+
+    def remove(self, obj: TypeVar('Base')):
+        """ Delete one object
+        """
+        raise NotImplementedError()
+
+    def flush(self):
+        """ Write every change still queued
+        """
+        pass
+
+    def transaction(self):
+        """ Context manager grouping the writes of a block
+        """
+        raise NotImplementedError()
+
+    def count(self, cls) -> int:
+        """ Number of objects of a class
+        """
+        raise NotImplementedError()
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ One object by ID, or None
+        """
+        raise NotImplementedError()
+
+    def search(self, cls, attributes: dict) -> List[TypeVar('Base')]:
+        """ All objects of a class with matching attributes
+        """
+        raise NotImplementedError()
+
+    def page(self, cls, limit: int, cursor: str = None) -> tuple:
+        """ Up to limit objects of a class in id order, starting after
+        the cursor id, and the cursor of the next page (None at the end)
+        """
+        raise NotImplementedError()
@@ -2,21 +2,34 @@
 """ User module
 """
 import hashlib
+from sys import intern
 from models.base import Base
 
 
+def _intern(value):
+    """ Intern a string value, leave anything else untouched
+    """
+    if type(value) is str:
+        return intern(value)
+    return value
+
+
 class User(Base):
     """ User class
     """
 
+    indexed_attributes = ('email',)
+    __slots__ = ('email', '_password', 'first_name', 'last_name')
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
         super().__init__(*args, **kwargs)
         self.email = kwargs.get('email')
         self._password = kwargs.get('_password')
-        self.first_name = kwargs.get('first_name')
-        self.last_name = kwargs.get('last_name')
+        # names repeat a lot across users, share one copy of each
+        self.first_name = _intern(kwargs.get('first_name'))
+        self.last_name = _intern(kwargs.get('last_name'))
 
     @property
     def password(self) -> str:
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """ UserSession module
 """
+from sys import intern
 from models.base import Base
 
 
@@ -9,10 +10,18 @@ class UserSession(Base):
     UserSession class
     """
 
+    indexed_attributes = ('session_id', 'user_id')
+    __slots__ = ('user_id', 'session_id')
+    # sessions are only serialized when saved, caching would just
+    # double their memory
+    cache_json = False
+
     def __init__(self, *args: list, **kwargs: dict):
         """
         Initialize a UserSession instance
         """
         super().__init__(*args, **kwargs)
-        self.user_id = kwargs.get('user_id')
+        # every session of a user shares one copy of its id
+        user_id = kwargs.get('user_id')
+        self.user_id = intern(user_id) if type(user_id) is str else user_id
         self.session_id = kwargs.get('session_id')
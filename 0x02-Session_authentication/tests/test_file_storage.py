@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+""" Tests of FileStorage, run with python3 -m unittest discover tests
+"""
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from models.engine import file_storage
+from models.engine.file_storage import FileStorage, _iter_json_object
+from models.user_session import UserSession
+
+
+def _random_value(rng: random.Random, depth: int = 0):
+    """ Random JSON value, numbers of every shape included
+    """
+    kind = rng.randrange(9 if depth < 3 else 6)
+    if kind == 0:
+        return rng.randint(-10 ** 12, 10 ** 12)
+    if kind == 1:
+        return rng.uniform(-1e6, 1e6) * 10 ** rng.randint(-30, 30)
+    if kind == 2:
+        return rng.choice([True, False, None, 0, -0.0, 1.5, -2.5e10])
+    if kind in (3, 4, 5):
+        return "".join(rng.choice('ab1.e-"\\ é\n') for _ in
+                       range(rng.randrange(6)))
+    if kind in (6, 7):
+        return [_random_value(rng, depth + 1)
+                for _ in range(rng.randrange(4))]
+    return {str(i): _random_value(rng, depth + 1)
+            for i in range(rng.randrange(4))}
+
+
+class TestIterJsonObject(unittest.TestCase):
+    """ Tests of the chunked JSON object reader
+    """
+
+    def _parse(self, text: str, chunk_size: int) -> dict:
+        """ Object read by _iter_json_object in chunks of chunk_size
+        """
+        return dict(_iter_json_object(io.StringIO(text), chunk_size))
+
+    def test_numbers_across_chunks(self):
+        """ A number cut by a chunk boundary is read whole
+        """
+        for text in ('{"a": -2.5e10}', '{"a": 1.5}', '{"a": 12, "b": 3}',
+                     '{"a":[1e-7,2E+3]}', '{"a": 10}'):
+            for chunk_size in range(1, len(text) + 1):
+                self.assertEqual(self._parse(text, chunk_size),
+                                 json.loads(text), (text, chunk_size))
+
+    def test_fuzz_against_json_loads(self):
+        """ Random objects read in any chunk size match json.loads
+        """
+        rng = random.Random(0)
+        for _ in range(300):
+            obj = {str(i): _random_value(rng)
+                   for i in range(rng.randrange(6))}
+            text = json.dumps(obj, indent=rng.choice([None, 0, 2]),
+                              ensure_ascii=rng.random() < 0.5)
+            for chunk_size in (1, 2, 3, 5, 7, 16, 64):
+                self.assertEqual(self._parse(text, chunk_size),
+                                 json.loads(text), (text, chunk_size))
+
+    def test_invalid(self):
+        """ Anything but a well-formed object raises ValueError
+        """
+        for text in ('', '[1]', '{"a" 1}', '{"a": 1 "b": 2}', '{"a": 1',
+                     '{"a": 1.}'):
+            for chunk_size in (1, 3, 64):
+                with self.assertRaises(ValueError, msg=(text, chunk_size)):
+                    self._parse(text, chunk_size)
+
+
+class TestJournal(unittest.TestCase):
+    """ Tests of the journal storage mode
+    """
+
+    def setUp(self):
+        """ Run in an empty directory, in journal mode
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+        patcher = mock.patch.object(file_storage, 'JOURNAL_MODE', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_compact_keeps_other_writers_records(self):
+        """ Compacting keeps the records another process appended
+        """
+        p1, p2 = FileStorage(), FileStorage()
+        p1.load(UserSession)
+        p2.load(UserSession)
+        for i in range(3):
+            p2.save(UserSession(user_id="p2", session_id="p2-{}".format(i)))
+            p1.save(UserSession(user_id="p1", session_id="p1-{}".format(i)))
+        p1.compact(UserSession)
+        self.assertFalse(os.path.exists(
+            file_storage._journal_path('UserSession', True)))
+        fresh = FileStorage()
+        fresh.load(UserSession)
+        self.assertEqual(fresh.count(UserSession), 6)
+        self.assertEqual(len(fresh.search(UserSession, {'user_id': "p2"})),
+                         3)
+        # the writer that didn't compact sees the new snapshot too
+        p2.save(UserSession(user_id="p2", session_id="p2-3"))
+        p2.refresh(UserSession)
+        self.assertEqual(p2.count(UserSession), 7)
+
+    def test_compact_after_other_compaction(self):
+        """ Compacting over a snapshot written by another process first
+        reloads it
+        """
+        p1, p2 = FileStorage(), FileStorage()
+        p1.load(UserSession)
+        p2.load(UserSession)
+        p1.save(UserSession(user_id="p1", session_id="p1-0"))
+        p2.save(UserSession(user_id="p2", session_id="p2-0"))
+        p2.compact(UserSession)
+        p2.save(UserSession(user_id="p2", session_id="p2-1"))
+        p1.compact(UserSession)
+        fresh = FileStorage()
+        fresh.load(UserSession)
+        self.assertEqual(fresh.count(UserSession), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+""" Tests of the session stores, run with python3 -m unittest discover tests
+"""
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from api.v1.auth.session_store import SQLiteSessionStore
+
+
+class TestSQLiteSessionStore(unittest.TestCase):
+    """ Tests of the SQLite session store
+    """
+
+    def setUp(self):
+        """ A store on a new database file
+        """
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.db_path = os.path.join(tmp.name, "sessions.sqlite3")
+        self.store = SQLiteSessionStore(self.db_path)
+
+    def _in_thread(self, fn):
+        """ Run fn in a new thread, like a request of the dev server
+        """
+        thread = threading.Thread(target=fn)
+        thread.start()
+        thread.join()
+
+    def test_connections_reused_across_threads(self):
+        """ One-shot threads neither open connections nor drop the cache
+        """
+        for i in range(50):
+            self.store["s{}".format(i)] = {"user_id": "u"}
+        self.store.get("s0")
+        with mock.patch.object(self.store, '_connect',
+                               wraps=self.store._connect) as connect:
+            for i in range(50):
+                self._in_thread(lambda: self.store.get("s0"))
+                self._in_thread(lambda: self.store.get("s{}".format(i)))
+        self.assertLessEqual(connect.call_count, 1)
+        with mock.patch.object(self.store, '_reader') as reader:
+            self.store.get("s0")
+        reader.assert_not_called()
+
+    def test_writes_of_other_processes(self):
+        """ A write through another store drops the cached value
+        """
+        self.store["s"] = {"user_id": "u"}
+        self.assertEqual(self.store.get("s"), {"user_id": "u"})
+        other = SQLiteSessionStore(self.db_path)
+        other["s"] = {"user_id": "v"}
+        self.assertEqual(self.store.get("s"), {"user_id": "v"})
+        other.pop("s")
+        self.assertIsNone(self.store.get("s"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,12 +6,31 @@ from crypt import methods
 from flask import Flask, jsonify, request, abort, redirect
 from sqlalchemy import false
 from auth import Auth
+from hasher import HasherBusy
 from typing import Union
 
 app = Flask(__name__)
 AUTH = Auth()
 
 
+@app.errorhandler(HasherBusy)
+def hasher_busy(error) -> tuple:
+    """
+    Password hashing is saturated: fail fast rather than queue the request
+    Return:
+      - json payload with status 503
+    """
+    return jsonify({"message": "service busy"}), 503, {"Retry-After": "1"}
+
+
+@app.teardown_appcontext
+def end_request(exception=None) -> None:
+    """
+    Release the database session of the request
+    """
+    AUTH.end_request()
+
+
 @app.route('/', methods=['GET'], strict_slashes=False)
 def base() -> str:
     """
@@ -85,7 +104,7 @@ def logout():
     user = AUTH.get_user_from_session_id(the_cookie)
     if the_cookie is None or user is None:
         abort(403)
-    AUTH.destroy_session(user.id)
+    AUTH.destroy_session(user.id, the_cookie)
     return redirect('/')
 
 
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+ASGI variant of app.py, on Quart and AsyncAuth.
+
+    $ hypercorn async_app:app --bind 0.0.0.0:5000 --workers 0
+
+--workers 0 serves from the main process: hypercorn's worker processes
+are daemonic and can't start the bcrypt pool of hasher.py.
+"""
+from quart import Quart, jsonify, request, abort, redirect
+from async_auth import AsyncAuth
+from hasher import HasherBusy
+from typing import Union
+
+app = Quart(__name__)
+AUTH = AsyncAuth()
+
+
+@app.before_serving
+async def startup() -> None:
+    """
+    Create the missing tables before the first request
+    """
+    await AUTH.init()
+
+
+@app.errorhandler(HasherBusy)
+async def hasher_busy(error) -> tuple:
+    """
+    Password hashing is saturated: fail fast rather than queue the request
+    Return:
+      - json payload with status 503
+    """
+    return jsonify({"message": "service busy"}), 503, {"Retry-After": "1"}
+
+
+@app.route('/', methods=['GET'], strict_slashes=False)
+async def base() -> str:
+    """
+    GET / route
+    """
+    return jsonify({"message": "Bienvenue"})
+
+
+@app.route('/users', methods=['POST'], strict_slashes=False)
+async def new_user() -> Union[str, tuple]:
+    """
+    POST method /users route
+    Registers new users with email and password,
+    or checks if the email is already registered
+    Return:
+      - json payload
+    """
+    form = await request.form
+    email = form.get("email")
+    password = form.get("password")
+
+    try:
+        user = await AUTH.register_user(email, password)
+        if user is not None:
+            return jsonify({
+                "email": user.email,
+                "message": "user created"
+            })
+    except ValueError:
+        return jsonify({
+            "message": "email already registered"
+            }), 400
+
+
+@app.route('/sessions', methods=['POST'], strict_slashes=False)
+async def login() -> str:
+    """
+    POST method, route /sessions
+    Creates new user session, stores the session id as a cookie
+
+    Return:
+      - json payload
+    """
+    form = await request.form
+    email = form.get("email")
+    password = form.get("password")
+
+    if not await AUTH.valid_login(email, password):
+        abort(401)
+    session_id = await AUTH.create_session(email)
+    response = jsonify({"email": email, "message": "logged in"})
+    response.set_cookie("session_id", session_id)
+    return response
+
+
+@app.route('/sessions', methods=['DELETE'], strict_slashes=False)
+async def logout():
+    """
+    method DELETE, route /sessions
+    Destroys a user session by finding the session_id key in the cookie
+    Return:
+      Redirects the user to the Base route (GET /)
+    """
+    the_cookie = request.cookies.get("session_id", None)
+    user = await AUTH.get_user_from_session_id(the_cookie)
+    if the_cookie is None or user is None:
+        abort(403)
+    await AUTH.destroy_session(user.id, the_cookie)
+    return redirect('/')
+
+
+@app.route('/profile', methods=['GET'], strict_slashes=False)
+async def profile() -> str:
+    """
+    method GET, route /profile
+    Finds the user using session id
+    Return:
+        - User's email with status 200
+        - 403 error if session id is invalid
+    """
+    user_cookie = request.cookies.get("session_id", None)
+    if user_cookie is None:
+        abort(403)
+    user = await AUTH.get_user_from_session_id(user_cookie)
+    if user is None:
+        abort(403)
+    return jsonify({"email": user.email}), 200
+
+
+@app.route('/reset_password', methods=['POST'], strict_slashes=False)
+async def get_reset_password_token() -> tuple:
+    """ method POST, route /reset_password
+        Args
+            - The user's email
+        Return:
+            - json payload
+            - 403 if email not registered
+    """
+    email = (await request.form).get('email')
+    try:
+        token = await AUTH.get_reset_password_token(email)
+        return jsonify({"email": email,
+                        "reset_token": token}), 200
+    except ValueError:
+        abort(403)
+
+
+@app.route('/reset_password', methods=['PUT'], strict_slashes=False)
+async def update_password() -> tuple:
+    """
+    method PUT, route /reset_password
+    Args
+        - email
+        - reset_token
+        - new_password
+    Return:
+        - the updated password
+        - 403 if token is invalid
+    """
+    form = await request.form
+    email = form.get('email')
+    reset_token = form.get('reset_token')
+    new_password = form.get('new_password')
+
+    try:
+        await AUTH.update_password(reset_token, new_password)
+        return jsonify({"email": email, "message": "Password updated"}), 200
+    except ValueError:
+        abort(403)
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""A module for authentication-related routines, awaited.
+"""
+import time
+from typing import Union
+from sqlalchemy.orm.exc import NoResultFound
+
+from async_db import AsyncDB
+from auth import SESSION_DURATION, SESSION_PURGE_INTERVAL, _generate_uuid
+from hasher import HASHER
+from user import User
+
+
+async def _hash_password(password: str) -> bytes:
+    """returned bytes is a salted hash of the input password
+    """
+    if password and isinstance(password, str):
+        return await HASHER.hash_password_async(password)
+
+
+class AsyncAuth:
+    """AsyncAuth class, Auth awaited on AsyncDB with bcrypt run by the
+    hashing pool.
+    """
+
+    def __init__(self):
+        """Initializes a new AsyncAuth instance.
+        """
+        self._db = AsyncDB()
+        self.__next_purge = time.monotonic() + SESSION_PURGE_INTERVAL
+
+    async def init(self) -> None:
+        """Creates the missing tables.
+        """
+        await self._db.init()
+
+    async def register_user(self, email: str, password: str) -> User:
+        """Adds a new user to the database.
+        """
+        try:
+            await self._db.find_user_by(email=email)
+            raise ValueError(f"User {email} already exists")
+        except NoResultFound:
+            return await self._db.add_user(email,
+                                           await _hash_password(password))
+
+    async def valid_login(self, email: str, password: str) -> bool:
+        """Checks if a user's login details are valid.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return False
+        if user is None or not isinstance(password, str):
+            return False
+        return await HASHER.check_password_async(password,
+                                                 user.hashed_password)
+
+    async def create_session(self, email: str) -> str:
+        """Creates a new session for a user.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            return None
+        session_id = _generate_uuid()
+        await self._db.add_session(user.id, session_id, SESSION_DURATION)
+        if time.monotonic() >= self.__next_purge:
+            self.__next_purge = time.monotonic() + SESSION_PURGE_INTERVAL
+            await self._db.purge_expired_sessions()
+        return session_id
+
+    async def get_user_from_session_id(self,
+                                       session_id: str) -> Union[User, None]:
+        """Retrieves a user based on a given session ID.
+        """
+        if session_id is None:
+            return None
+        try:
+            return await self._db.find_user_by_session(session_id)
+        except NoResultFound:
+            return None
+
+    async def destroy_session(self, user_id: int,
+                              session_id: str = None) -> None:
+        """Destroys one session of a given user, or all of them.
+        """
+        if user_id is None:
+            return None
+        await self._db.remove_sessions(user_id, session_id)
+
+    async def get_reset_password_token(self, email: str) -> str:
+        """Generates a password reset token for a user.
+        """
+        try:
+            user = await self._db.find_user_by(email=email)
+        except NoResultFound:
+            raise ValueError()
+        reset_token = _generate_uuid()
+        await self._db.update_user(user.id, reset_token=reset_token)
+        return reset_token
+
+    async def update_password(self, reset_token: str, password: str) -> None:
+        """Updates a user's password given the user's reset token.
+        """
+        try:
+            user = await self._db.find_user_by(reset_token=reset_token)
+        except NoResultFound:
+            raise ValueError()
+        new_password_hash = await _hash_password(password)
+        await self._db.update_user(
+            user.id,
+            hashed_password=new_password_hash,
+            reset_token=None,
+        )
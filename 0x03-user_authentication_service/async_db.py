@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Async DB module
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.exc import NoResultFound
+
+from db import DB_URL, DB_RESET, SESSION_TOUCH_INTERVAL, _sqlite_pragmas
+from user import Base, User, UserSession
+
+
+def _async_url(url: str) -> str:
+    """
+    URL of the async driver of a database URL: aiosqlite for SQLite
+    """
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+class AsyncDB:
+    """AsyncDB class, DB awaited on an async driver
+    """
+
+    def __init__(self, url: str = None) -> None:
+        """Initialize a new AsyncDB instance, call init() before use
+        Args:
+            url (str): database URL, DB_URL by default
+        """
+        url = _async_url(url or DB_URL)
+        self._engine = create_async_engine(url, pool_pre_ping=True)
+        if url.startswith("sqlite") and ":memory:" not in url:
+            event.listen(self._engine.sync_engine, "connect",
+                         _sqlite_pragmas)
+        # one session per call: an AsyncSession can't be shared by
+        # concurrent tasks
+        self._sessionmaker = sessionmaker(bind=self._engine,
+                                          class_=AsyncSession,
+                                          expire_on_commit=False)
+
+    async def init(self) -> None:
+        """
+        Create the missing tables
+        """
+        async with self._engine.begin() as conn:
+            if DB_RESET:
+                await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def add_user(self, email: str, hashed_password: str) -> User:
+        """
+        Create a User object and save it to the database
+        Args:
+            email (str): user's email address
+            hashed_password (str): password hashed by bcrypt's hashpw
+        Return:
+            Newly created User object
+        """
+        user = User(email=email, hashed_password=hashed_password)
+        async with self._sessionmaker() as session:
+            session.add(user)
+            await session.commit()
+        return user
+
+    @staticmethod
+    def _query(**kwargs):
+        """
+        Select statement of the user matching all attributes
+        """
+        if not kwargs:
+            raise NoResultFound
+        for k, v in kwargs.items():
+            if k not in User.__table__.columns:
+                raise InvalidRequestError
+            # None would match every user without a value, not one user
+            if v is None:
+                raise NoResultFound
+        return select(User).filter_by(**kwargs)
+
+    async def find_user_by(self, **kwargs) -> User:
+        """
+        Return the user matching all the attributes passed as arguments
+        Args:
+            attributes (dict): a dictionary of attributes to match the user
+        Return:
+            matching user or raise error
+        """
+        query = self._query(**kwargs)
+        async with self._sessionmaker() as session:
+            result = await session.execute(query)
+            return result.scalars().one()
+
+    async def update_user(self, user_id: int, **kwargs) -> None:
+        """
+        Update a user's attributes
+        Args:
+            user_id (int): user's id
+            kwargs (dict): dict of key, value pairs representing the
+                           attributes to update and the values to update
+                           them with
+        Return:
+            No return value
+        """
+        async with self._sessionmaker() as session:
+            result = await session.execute(self._query(id=user_id))
+            try:
+                usr = result.scalars().one()
+            except NoResultFound:
+                raise ValueError()
+            for k, v in kwargs.items():
+                if hasattr(usr, k):
+                    setattr(usr, k, v)
+                else:
+                    raise ValueError
+            await session.commit()
+
+    async def close(self) -> None:
+        """
+        Close every pooled connection
+        """
+        await self._engine.dispose()
+
+    async def add_session(self, user_id: int, session_id: str,
+                          duration: int) -> UserSession:
+        """
+        Create a session of a user
+        Args:
+            user_id (int): user's id
+            session_id (str): id of the new session
+            duration (int): seconds before the session expires
+        Return:
+            Newly created UserSession object
+        """
+        now = datetime.utcnow()
+        user_session = UserSession(
+            id=session_id, user_id=user_id, created_at=now, last_seen=now,
+            expires_at=now + timedelta(seconds=duration))
+        async with self._sessionmaker() as session:
+            session.add(user_session)
+            await session.commit()
+        return user_session
+
+    async def find_user_by_session(self, session_id: str) -> User:
+        """
+        Return the user of a session that has not expired
+        Args:
+            session_id (str): session id
+        Return:
+            user of the session or raise NoResultFound
+        """
+        now = datetime.utcnow()
+        query = select(User, UserSession).join(
+            UserSession, UserSession.user_id == User.id).filter(
+            UserSession.id == session_id, UserSession.expires_at > now)
+        async with self._sessionmaker() as session:
+            result = await session.execute(query)
+            user, user_session = result.one()
+            if user_session.last_seen + SESSION_TOUCH_INTERVAL < now:
+                user_session.last_seen = now
+                await session.commit()
+            return user
+
+    async def remove_sessions(self, user_id: int,
+                              session_id: str = None) -> int:
+        """
+        Delete one session of a user, or all of them
+        Args:
+            user_id (int): user's id
+            session_id (str): id of the session, None for all
+        Return:
+            number of sessions deleted
+        """
+        query = delete(UserSession).where(UserSession.user_id == user_id)
+        if session_id is not None:
+            query = query.where(UserSession.id == session_id)
+        async with self._sessionmaker() as session:
+            result = await session.execute(query)
+            await session.commit()
+        return result.rowcount
+
+    async def purge_expired_sessions(self, batch_size: int = 1000) -> int:
+        """
+        Delete the expired sessions, batch_size rows per transaction
+        Return:
+            number of sessions deleted
+        """
+        now = datetime.utcnow()
+        purged = 0
+        async with self._sessionmaker() as session:
+            while True:
+                result = await session.execute(
+                    select(UserSession.id).filter(
+                        UserSession.expires_at <= now).limit(batch_size))
+                ids = result.scalars().all()
+                if not ids:
+                    break
+                await session.execute(delete(UserSession).where(
+                    UserSession.id.in_(ids)))
+                await session.commit()
+                purged += len(ids)
+                if len(ids) < batch_size:
+                    break
+        return purged
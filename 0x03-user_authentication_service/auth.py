@@ -1,20 +1,28 @@
 #!/usr/bin/env python3
 """A module for authentication-related routines.
 """
-import bcrypt
+import os
+import threading
+import time
 from uuid import uuid4
 from typing import Union
 from sqlalchemy.orm.exc import NoResultFound
 
 from db import DB
+from hasher import HASHER
 from user import User
 
 
+SESSION_DURATION = int(os.getenv("SESSION_DURATION", "86400"))
+# expired sessions are purged at most once per interval
+SESSION_PURGE_INTERVAL = int(os.getenv("SESSION_PURGE_INTERVAL", "60"))
+
+
 def _hash_password(password: str) -> bytes:
     """returned bytes is a salted hash of the input password
     """
     if password and isinstance(password, str):
-        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+        return HASHER.hash_password(password)
 
 
 def _generate_uuid() -> str:
@@ -31,6 +39,13 @@ class Auth:
         """Initializes a new Auth instance.
         """
         self._db = DB()
+        self.__next_purge = time.monotonic() + SESSION_PURGE_INTERVAL
+        self.__purge_lock = threading.Lock()
+
+    def end_request(self) -> None:
+        """Releases the database session used by the current request.
+        """
+        self._db.remove_session()
 
     def register_user(self, email: str, password: str) -> User:
         """Adds a new user to the database.
@@ -48,16 +63,13 @@ class Auth:
         try:
             user = self._db.find_user_by(email=email)
             if user is not None:
-                return bcrypt.checkpw(
-                    password.encode("utf-8"),
-                    user.hashed_password,
-                )
+                return HASHER.check_password(password, user.hashed_password)
         except NoResultFound:
             return False
         return False
 
     def create_session(self, email: str) -> str:
-        """Creates a new session for a user.
+        """Creates a new session for a user, next to its other ones.
         """
         user = None
         try:
@@ -67,9 +79,22 @@ class Auth:
         if user is None:
             return None
         session_id = _generate_uuid()
-        self._db.update_user(user.id, session_id=session_id)
+        self._db.add_session(user.id, session_id, SESSION_DURATION)
+        self._purge_expired_sessions()
         return session_id
 
+    def _purge_expired_sessions(self) -> None:
+        """Purges the expired sessions, once per SESSION_PURGE_INTERVAL.
+        """
+        if time.monotonic() < self.__next_purge or \
+                not self.__purge_lock.acquire(blocking=False):
+            return
+        try:
+            self.__next_purge = time.monotonic() + SESSION_PURGE_INTERVAL
+            self._db.purge_expired_sessions()
+        finally:
+            self.__purge_lock.release()
+
     def get_user_from_session_id(self, session_id: str) -> Union[User, None]:
         """Retrieves a user based on a given session ID.
         """
@@ -77,17 +102,17 @@ class Auth:
         if session_id is None:
             return None
         try:
-            user = self._db.find_user_by(session_id=session_id)
+            user = self._db.find_user_by_session(session_id)
         except NoResultFound:
             return None
         return user
 
-    def destroy_session(self, user_id: int) -> None:
-        """Destroys a session associated with a given user.
+    def destroy_session(self, user_id: int, session_id: str = None) -> None:
+        """Destroys one session of a given user, or all of them.
         """
         if user_id is None:
             return None
-        self._db.update_user(user_id, session_id=None)
+        self._db.remove_sessions(user_id, session_id)
 
     def get_reset_password_token(self, email: str) -> str:
         """Generates a password reset token for a user.
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Throughput of app.py (Flask, threaded) against async_app.py (ASGI)
+
+Each server runs in its own process on a scratch database. Concurrent
+keep-alive clients then call GET /profile with a valid session for a
+fixed time, and the requests per second and latencies are compared.
+
+    $ python3 benchmark_async.py [seconds] [clients,clients,...]
+"""
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+HOST = "127.0.0.1"
+SERVERS = {
+    "flask": [sys.executable, "-c",
+              "from app import app; "
+              "app.run(host='{host}', port={port}, threaded=True)"],
+    "asgi": [sys.executable, "-m", "hypercorn", "async_app:app",
+             "--bind", "{host}:{port}", "--workers", "0"],
+}
+
+
+async def request(reader, writer, method: str, path: str,
+                  headers: dict = None, body: bytes = b"") -> tuple:
+    """
+    Send one HTTP/1.1 request on a connection
+    Return:
+        status, headers and body of the response
+    """
+    lines = ["{} {} HTTP/1.1".format(method, path), "Host: " + HOST,
+             "Content-Length: {}".format(len(body))]
+    lines += ["{}: {}".format(k, v) for k, v in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    response_headers = {}
+    for line in header_lines:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            response_headers[k.strip().lower()] = v.strip()
+    length = int(response_headers.get("content-length", 0))
+    data = await reader.readexactly(length)
+    keep_alive = status_line.startswith("HTTP/1.1") and \
+        response_headers.get("connection", "").lower() != "close"
+    return int(status_line.split()[1]), response_headers, data, keep_alive
+
+
+async def call(port: int, method: str, path: str, headers: dict = None,
+               body: bytes = b"") -> tuple:
+    """
+    One request on a new connection
+    """
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        return await asyncio.wait_for(
+            request(reader, writer, method, path, headers, body), 30)
+    finally:
+        writer.close()
+
+
+async def login(port: int) -> str:
+    """
+    Register and log in a user, return its session cookie
+    """
+    form = urlencode({"email": "bench@example.com",
+                      "password": "bench"}).encode()
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    await call(port, "POST", "/users", headers, form)
+    status, response_headers, _, _ = await call(port, "POST", "/sessions",
+                                                headers, form)
+    if status != 200:
+        raise RuntimeError("login failed with status {}".format(status))
+    return response_headers["set-cookie"].split(";")[0]
+
+
+async def client(port: int, cookie: str, deadline: float,
+                 latencies: list, errors: list) -> None:
+    """
+    Call GET /profile until deadline, reconnecting when the server
+    closes the connection
+    """
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            start = time.perf_counter()
+            status, _, _, keep_alive = await request(
+                reader, writer, "GET", "/profile", {"Cookie": cookie})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError) as e:
+            errors.append(type(e).__name__)
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def run(port: int, cookie: str, clients: int,
+              seconds: float) -> dict:
+    """
+    Requests per second, latencies and errors of clients for seconds
+    """
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(client(port, cookie, deadline, latencies, errors)
+                           for _ in range(clients)))
+    latencies.sort()
+    if not latencies:
+        latencies = [float("nan")]
+    return {
+        "rps": len(latencies) / seconds,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        "errors": len(errors),
+    }
+
+
+async def wait_ready(port: int, timeout: float = 30) -> None:
+    """
+    Wait until the server answers GET /
+    """
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            await call(port, "GET", "/")
+            return
+        except (OSError, asyncio.TimeoutError):
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+def serve(name: str, port: int, db_path: str) -> subprocess.Popen:
+    """
+    Start a server in its own process group, with its hashing
+    workers, on a scratch database
+    """
+    command = [part.format(host=HOST, port=port) for part in SERVERS[name]]
+    env = dict(os.environ, DB_URL="sqlite:///" + db_path)
+    return subprocess.Popen(command, env=env,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    levels = [int(n) for n in sys.argv[2].split(",")] \
+        if len(sys.argv) > 2 else [10, 100, 1000]
+    print("{:>6} {:>8} {:>10} {:>9} {:>9} {:>7}".format(
+        "server", "clients", "req/s", "p50 ms", "p99 ms", "errors"))
+    with tempfile.TemporaryDirectory() as tmp:
+        for port, name in enumerate(SERVERS, 5100):
+            server = serve(name, port, os.path.join(tmp, name + ".db"))
+            try:
+                asyncio.run(wait_ready(port))
+                cookie = asyncio.run(login(port))
+                for clients in levels:
+                    result = asyncio.run(run(port, cookie, clients, seconds))
+                    print("{:>6} {:>8} {rps:>10.0f} {p50:>9.1f} "
+                          "{p99:>9.1f} {errors:>7}".format(name, clients,
+                                                           **result))
+            finally:
+                os.killpg(server.pid, signal.SIGTERM)
+                server.wait()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""A module importing users in bulk from CSV or NDJSON files.
+
+    $ python3 bulk_import.py users.csv [--format csv|ndjson]
+                             [--batch-size 1000] [--workers N]
+
+Each record holds an email and a plain password. Passwords are hashed
+across a process pool, emails already registered or repeated in the
+file are skipped, and each batch is inserted in one transaction.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, TextIO
+
+from db import DB
+from hasher import _hashpw
+
+
+def read_records(f: TextIO, fmt: str) -> Iterator[dict]:
+    """Yields the records of a CSV file with a header, or of an NDJSON
+    file, one at a time; None for an NDJSON line that isn't valid JSON.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+        return
+    for line in f:
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+
+
+def _batches(records: Iterable[dict], size: int) -> Iterator[list]:
+    """Yields lists of up to size records.
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_users(db: DB, records: Iterable[dict], batch_size: int = 1000,
+                 workers: int = None,
+                 progress: Callable[[dict], None] = None) -> dict:
+    """Registers users from records of email and password.
+    Args:
+        db (DB): database to insert into
+        records (iterable): dicts with "email" and "password", anything
+            else counted as invalid
+        batch_size (int): records hashed and inserted together
+        workers (int): hashing processes, one per CPU by default
+        progress (callable): called with the counters after each batch
+    Return:
+        counters: read, imported, duplicates, invalid, seconds
+    """
+    stats = {"read": 0, "imported": 0, "duplicates": 0, "invalid": 0,
+             "seconds": 0.0}
+    seen = set()
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        for batch in _batches(records, batch_size):
+            stats["read"] += len(batch)
+            valid = []
+            for record in batch:
+                if not isinstance(record, dict):
+                    stats["invalid"] += 1
+                    continue
+                email = record.get("email")
+                password = record.get("password")
+                if not email or not password or \
+                        not isinstance(email, str) or \
+                        not isinstance(password, str):
+                    stats["invalid"] += 1
+                elif email in seen:
+                    stats["duplicates"] += 1
+                else:
+                    seen.add(email)
+                    valid.append((email, password))
+            registered = db.existing_emails(email for email, _ in valid)
+            stats["duplicates"] += len(registered)
+            valid = [(email, password) for email, password in valid
+                     if email not in registered]
+            chunksize = max(1, len(valid) // (4 * workers))
+            hashed = pool.map(_hashpw,
+                              (password.encode("utf-8")
+                               for _, password in valid),
+                              chunksize=chunksize)
+            stats["imported"] += db.add_users([
+                {"email": email, "hashed_password": hashed_password}
+                for (email, _), hashed_password in zip(valid, hashed)])
+            stats["seconds"] = time.perf_counter() - start
+            if progress is not None:
+                progress(dict(stats))
+    return stats
+
+
+def _report(stats: dict) -> None:
+    """Prints the counters and throughput of an import to stderr.
+    """
+    rate = stats["imported"] / stats["seconds"] if stats["seconds"] else 0
+    print("read {read}, imported {imported}, duplicates {duplicates}, "
+          "invalid {invalid}, {rate:.0f} users/s".format(rate=rate, **stats),
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Import users from a CSV or NDJSON file")
+    parser.add_argument("file", help="file to import, - for stdin")
+    parser.add_argument("--format", choices=("csv", "ndjson"),
+                        help="file format, from its extension by default")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if args.file.endswith(".csv") else "ndjson")
+    f = sys.stdin if args.file == "-" else open(args.file, newline="")
+    with f:
+        stats = import_users(DB(), read_records(f, fmt), args.batch_size,
+                             args.workers, _report)
+    if stats["read"] == 0:
+        _report(stats)
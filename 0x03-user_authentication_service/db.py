@@ -2,36 +2,88 @@
 """
 DB module
 """
-from sqlalchemy import create_engine
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Set
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.exc import InvalidRequestError
 
-from user import Base, User
+from user import Base, User, UserSession
+from user_cache import CACHED_COLUMNS, UserCache
+
+
+DB_URL = os.getenv("DB_URL", "sqlite:///a.db")
+DB_POOL_SIZE = os.getenv("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = os.getenv("DB_MAX_OVERFLOW")
+# DB_RESET=1 drops every table at startup, the former behaviour
+DB_RESET = os.getenv("DB_RESET", "0") == "1"
+# last_seen of a session is written at most once per interval
+SESSION_TOUCH_INTERVAL = timedelta(
+    seconds=int(os.getenv("SESSION_TOUCH_INTERVAL", "60")))
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Run SQLite in WAL mode, readers never waiting for the writer, and
+    enforce foreign keys so deleting a user deletes its sessions
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
 
 
 class DB:
     """DB class
     """
 
-    def __init__(self) -> None:
+    def __init__(self, url: str = None) -> None:
         """Initialize a new DB instance
+        Args:
+            url (str): database URL, DB_URL by default
         """
-        self._engine = create_engine("sqlite:///a.db")
-        Base.metadata.drop_all(self._engine)
+        url = url or DB_URL
+        sqlite_file = url.startswith("sqlite") and ":memory:" not in url \
+            and url.rstrip("/") != "sqlite:"
+        options = {}
+        if DB_POOL_SIZE is not None:
+            options["pool_size"] = int(DB_POOL_SIZE)
+        if DB_MAX_OVERFLOW is not None:
+            options["max_overflow"] = int(DB_MAX_OVERFLOW)
+        if url.startswith("sqlite"):
+            # pooled connections move between the request threads
+            options["connect_args"] = {"check_same_thread": False}
+        if sqlite_file:
+            # SQLAlchemy 1.4 defaults file SQLite to NullPool, which
+            # takes no pool options and reconnects on every checkout
+            options["poolclass"] = QueuePool
+        self._engine = create_engine(url, pool_pre_ping=True, **options)
+        if sqlite_file:
+            event.listen(self._engine, "connect", _sqlite_pragmas)
+        if DB_RESET:
+            Base.metadata.drop_all(self._engine)
+        # only creates the missing tables
         Base.metadata.create_all(self._engine)
-        self.__session = None
+        self.__session = scoped_session(sessionmaker(bind=self._engine))
+        self.user_cache = UserCache()
 
     @property
     def _session(self) -> Session:
-        """Memoized session object
+        """Session object of the calling thread
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """Closes the session of the calling thread, returning its
+        connection to the pool
+        """
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -47,6 +99,35 @@ class DB:
         self._session.commit()
         return user
 
+    def add_users(self, users: List[dict]) -> int:
+        """
+        Insert many users in one transaction
+        Args:
+            users (list): dicts of User columns, email and hashed_password
+                          at least
+        Return:
+            number of users inserted
+        """
+        try:
+            self._session.bulk_insert_mappings(User, users)
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
+        return len(users)
+
+    def existing_emails(self, emails: Iterable[str]) -> Set[str]:
+        """
+        Emails already registered among emails, found with the email index
+        Args:
+            emails (iterable): emails to check
+        Return:
+            set of the registered ones
+        """
+        rows = self._session.query(User.email).filter(
+            User.email.in_(list(emails)))
+        return {email for email, in rows}
+
     def find_user_by(self, **kwargs) -> User:
         """
         Return a user who has an attribute matching the attributes passed
@@ -54,16 +135,27 @@ class DB:
         Args:
             attributes (dict): a dictionary of attributes to match the user
         Return:
-            matching user or raise error
+            the user matching all attributes, found in one query using
+            the column indexes, or raise error; a lookup by email alone
+            may return a new transient User copied from user_cache
         """
-        all_users = self._session.query(User)
+        if not kwargs:
+            raise NoResultFound
         for k, v in kwargs.items():
-            if k not in User.__dict__:
+            if k not in User.__table__.columns:
                 raise InvalidRequestError
-            for usr in all_users:
-                if getattr(usr, k) == v:
-                    return usr
-        raise NoResultFound
+            # None would match every user without a value, not one user
+            if v is None:
+                raise NoResultFound
+        column, value = next(iter(kwargs.items()))
+        if len(kwargs) > 1 or column not in CACHED_COLUMNS:
+            return self._session.query(User).filter_by(**kwargs).one()
+        user = self.user_cache.get(column, value)
+        if user is None:
+            generation = self.user_cache.generation
+            user = self._session.query(User).filter_by(**kwargs).one()
+            self.user_cache.put(user, generation)
+        return user
 
     def update_user(self, user_id: int, **kwargs) -> None:
         """
@@ -76,13 +168,99 @@ class DB:
         Return:
             No return value
         """
-        try:
-            usr = self.find_user_by(id=user_id)
-        except NoResultFound:
-            raise ValueError()
-        for k, v in kwargs.items():
-            if hasattr(usr, k):
-                setattr(usr, k, v)
-            else:
+        for k in kwargs:
+            if k not in User.__table__.columns:
                 raise ValueError
+        # one UPDATE statement, without loading the user first
+        updated = self._session.query(User).filter_by(id=user_id).update(
+            kwargs, synchronize_session="evaluate")
+        if updated == 0:
+            self._session.rollback()
+            raise ValueError()
         self._session.commit()
+        self.user_cache.invalidate(user_id)
+
+    def add_session(self, user_id: int, session_id: str,
+                    duration: int) -> UserSession:
+        """
+        Create a session of a user
+        Args:
+            user_id (int): user's id
+            session_id (str): id of the new session
+            duration (int): seconds before the session expires
+        Return:
+            Newly created UserSession object
+        """
+        now = datetime.utcnow()
+        user_session = UserSession(
+            id=session_id, user_id=user_id, created_at=now, last_seen=now,
+            expires_at=now + timedelta(seconds=duration))
+        self._session.add(user_session)
+        self._session.commit()
+        return user_session
+
+    def find_user_by_session(self, session_id: str) -> User:
+        """
+        Return the user of a session that has not expired, found with the
+        sessions primary key
+        Args:
+            session_id (str): session id
+        Return:
+            user of the session or raise NoResultFound
+        """
+        user = self.user_cache.get("session", session_id)
+        if user is not None:
+            return user
+        generation = self.user_cache.generation
+        now = datetime.utcnow()
+        user, user_session = self._session.query(User, UserSession).join(
+            UserSession, UserSession.user_id == User.id).filter(
+            UserSession.id == session_id,
+            UserSession.expires_at > now).one()
+        if user_session.last_seen + SESSION_TOUCH_INTERVAL < now:
+            user_session.last_seen = now
+            self._session.commit()
+        self.user_cache.put(
+            user, generation, session_id=session_id,
+            valid_for=(user_session.expires_at - now).total_seconds())
+        return user
+
+    def remove_sessions(self, user_id: int, session_id: str = None) -> int:
+        """
+        Delete one session of a user, or all of them
+        Args:
+            user_id (int): user's id
+            session_id (str): id of the session, None for all
+        Return:
+            number of sessions deleted
+        """
+        query = self._session.query(UserSession).filter_by(user_id=user_id)
+        if session_id is not None:
+            query = query.filter_by(id=session_id)
+        removed = query.delete(synchronize_session=False)
+        self._session.commit()
+        self.user_cache.invalidate(user_id)
+        return removed
+
+    def purge_expired_sessions(self, batch_size: int = 1000) -> int:
+        """
+        Delete the expired sessions, batch_size rows per transaction, so
+        writers are never blocked for long
+        Return:
+            number of sessions deleted
+        """
+        now = datetime.utcnow()
+        purged = 0
+        while True:
+            ids = [session_id for session_id, in self._session.query(
+                UserSession.id).filter(
+                UserSession.expires_at <= now).limit(batch_size)]
+            if not ids:
+                break
+            self._session.query(UserSession).filter(
+                UserSession.id.in_(ids)).delete(synchronize_session=False)
+            self._session.commit()
+            purged += len(ids)
+            if len(ids) < batch_size:
+                break
+        return purged
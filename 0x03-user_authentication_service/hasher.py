@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""A module running bcrypt hashing and verification off the request thread.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", os.cpu_count() or 1))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", HASH_WORKERS * 4))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "5"))
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is saturated or too slow to answer.
+    """
+
+
+def _hashpw(password: bytes) -> bytes:
+    """Salted bcrypt hash of a password, run in a worker process.
+    """
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+
+def _checkpw(password: bytes, hashed_password: bytes) -> bool:
+    """Checks a password against its bcrypt hash, run in a worker process.
+    """
+    return bcrypt.checkpw(password, hashed_password)
+
+
+class Hasher:
+    """Process pool for bcrypt calls, with a bounded number of calls
+    queued or running and a timeout per call.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS,
+                 queue_size: int = HASH_QUEUE_SIZE,
+                 timeout: float = HASH_TIMEOUT) -> None:
+        """Initializes a new Hasher, 0 workers running the calls inline.
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.__slots = threading.BoundedSemaphore(max(queue_size, 1))
+        self.__pool = None
+        self.__pool_lock = threading.Lock()
+
+    @property
+    def _pool(self) -> ProcessPoolExecutor:
+        """Memoized process pool, started on first use.
+        """
+        if self.__pool is None:
+            with self.__pool_lock:
+                if self.__pool is None:
+                    self.__pool = ProcessPoolExecutor(self.workers)
+        return self.__pool
+
+    def _submit(self, fn, *args) -> Future:
+        """Submits fn to the pool, raising HasherBusy instead of waiting
+        for a free slot.
+        """
+        if not self.__slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self.__slots.release()
+            raise
+        # the slot stays taken until the worker is done, even after a
+        # timeout, so a stuck pool keeps refusing new calls
+        future.add_done_callback(lambda _: self.__slots.release())
+        return future
+
+    def _run(self, fn, *args):
+        """Runs fn in the pool, raising HasherBusy instead of waiting
+        for a free slot or past the timeout.
+        """
+        if self.workers <= 0:
+            return fn(*args)
+        try:
+            return self._submit(fn, *args).result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusy()
+
+    async def _run_async(self, fn, *args):
+        """Awaits fn run in the pool, like _run without blocking the
+        event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self.workers <= 0:
+            return await loop.run_in_executor(None, fn, *args)
+        future = asyncio.wrap_future(self._submit(fn, *args), loop=loop)
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise HasherBusy()
+
+    def hash_password(self, password: str) -> bytes:
+        """Returns a salted hash of the input password.
+        """
+        return self._run(_hashpw, password.encode("utf-8"))
+
+    def check_password(self, password: str, hashed_password: bytes) -> bool:
+        """Checks a password against its hash.
+        """
+        return self._run(_checkpw, password.encode("utf-8"), hashed_password)
+
+    async def hash_password_async(self, password: str) -> bytes:
+        """Returns a salted hash of the input password, awaited.
+        """
+        return await self._run_async(_hashpw, password.encode("utf-8"))
+
+    async def check_password_async(self, password: str,
+                                   hashed_password: bytes) -> bool:
+        """Checks a password against its hash, awaited.
+        """
+        return await self._run_async(_checkpw, password.encode("utf-8"),
+                                     hashed_password)
+
+    def shutdown(self) -> None:
+        """Stops the worker processes.
+        """
+        with self.__pool_lock:
+            if self.__pool is not None:
+                self.__pool.shutdown()
+                self.__pool = None
+
+
+HASHER = Hasher()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Tests for the authentication service, run with
+python3 -m unittest test_auth
+"""
+import importlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+_TMP = tempfile.TemporaryDirectory()
+os.environ["DB_URL"] = "sqlite:///{}".format(
+    os.path.join(_TMP.name, "test.db"))
+os.environ["HASH_WORKERS"] = "0"
+
+import bcrypt  # noqa: E402
+
+# 4 rounds instead of 12, the tests are about the flows not the hashes
+_gensalt = bcrypt.gensalt
+bcrypt.gensalt = lambda rounds=4, prefix=b"2b": _gensalt(rounds, prefix)
+
+import db  # noqa: E402
+from bulk_import import import_users, read_records  # noqa: E402
+from app import AUTH, app  # noqa: E402
+from user import User, UserSession  # noqa: E402
+
+
+class TestDB(unittest.TestCase):
+    """Tests for the DB engine setup
+    """
+
+    def test_pool_options_on_sqlite_file(self) -> None:
+        """DB_POOL_SIZE and DB_MAX_OVERFLOW pool a file SQLite database
+        """
+        env = {"DB_POOL_SIZE": "2", "DB_MAX_OVERFLOW": "3"}
+        with mock.patch.dict(os.environ, env):
+            importlib.reload(db)
+        self.addCleanup(importlib.reload, db)
+        pooled = db.DB()
+        self.addCleanup(pooled._engine.dispose)
+        self.assertEqual(pooled._engine.pool.size(), 2)
+        self.assertEqual(pooled._engine.pool._max_overflow, 3)
+        pooled.add_user("pool@example.com", "hashed")
+        pooled.remove_session()
+        self.assertEqual(pooled._engine.pool.checkedin(), 1)
+
+    def test_delete_user_deletes_sessions(self) -> None:
+        """Sessions of a deleted user are deleted with it
+        """
+        user = AUTH._db.add_user("cascade@example.com", "hashed")
+        AUTH._db.add_session(user.id, "cascade-1", 60)
+        AUTH._db.add_session(user.id, "cascade-2", 60)
+        session = AUTH._db._session
+        session.query(User).filter_by(id=user.id).delete()
+        session.commit()
+        self.assertEqual(session.query(UserSession).filter_by(
+            user_id=user.id).count(), 0)
+
+
+class TestBulkImport(unittest.TestCase):
+    """Tests for bulk_import
+    """
+
+    def test_invalid_ndjson_lines(self) -> None:
+        """Lines that aren't JSON objects are counted, not fatal
+        """
+        f = io.StringIO('{"email": "bulk1@example.com", "password": "p"}\n'
+                        '{"email": \n'
+                        '["bulk2@example.com", "p"]\n'
+                        '{"email": "bulk3@example.com", "password": "p"}\n')
+        stats = import_users(AUTH._db, read_records(f, "ndjson"),
+                             batch_size=2, workers=1)
+        self.assertEqual((stats["read"], stats["imported"],
+                          stats["invalid"]), (4, 2, 2))
+
+
+class TestResetPassword(unittest.TestCase):
+    """Tests for PUT /reset_password
+    """
+
+    def setUp(self) -> None:
+        """Two users without a reset token
+        """
+        self.client = app.test_client()
+        for email in ("bob@example.com", "alice@example.com"):
+            try:
+                AUTH.register_user(email, "pwd")
+            except ValueError:
+                pass
+
+    def test_missing_token(self) -> None:
+        """No reset_token is refused, not a server error
+        """
+        with self.assertRaises(ValueError):
+            AUTH.update_password(None, "new")
+        response = self.client.put("/reset_password", data={
+            "email": "bob@example.com", "new_password": "new"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_valid_token(self) -> None:
+        """A token from POST /reset_password resets the password once
+        """
+        token = AUTH.get_reset_password_token("bob@example.com")
+        response = self.client.put("/reset_password", data={
+            "email": "bob@example.com", "reset_token": token,
+            "new_password": "new"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(AUTH.valid_login("bob@example.com", "new"))
+        with self.assertRaises(ValueError):
+            AUTH.update_password(token, "again")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,7 @@
 User Class
 """
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, String, Integer
+from sqlalchemy import Column, DateTime, ForeignKey, String, Integer
 
 Base = declarative_base()
 
@@ -15,7 +15,23 @@ class User(Base):
     __tablename__ = 'users'
 
     id = Column(Integer, primary_key=True)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, unique=True)
     hashed_password = Column(String(250), nullable=False)
-    session_id = Column(String(250), nullable=True)
-    reset_token = Column(String(250), nullable=True)
+    # sessions now live in the sessions table: this column is never
+    # written, only kept so the schema matches existing databases
+    session_id = Column(String(250), nullable=True, unique=True)
+    reset_token = Column(String(250), nullable=True, unique=True)
+
+
+class UserSession(Base):
+    """
+    The session class: one row per logged in device of a user
+    """
+    __tablename__ = 'sessions'
+
+    id = Column(String(250), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'),
+                     nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+User cache module
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Union
+
+from user import User
+
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "5"))
+# lookups the cache answers: users are found by these columns, and by
+# the id of one of their sessions under the "session" key
+CACHED_COLUMNS = ("email",)
+
+
+class UserCache:
+    """UserCache class, bounded LRU of users by email and session ID
+
+    Entries hold the column values of a user, and hits return a new
+    detached User built from them, so no ORM session is shared between
+    threads. DB.update_user drops the entries of the user it updates;
+    the TTL bounds how long another process's update goes unseen.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_SIZE,
+                 ttl: float = USER_CACHE_TTL) -> None:
+        """Initialize a new UserCache
+        Args:
+            max_size (int): number of entries kept, 0 disables the cache
+            ttl (float): seconds an entry stays valid
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # entries[(column, value)] = (column values, expiry)
+        self.__entries = OrderedDict()
+        # keys[user id] = keys of the entries of the user
+        self.__keys = {}
+        # bumped on every invalidation, so a lookup that read the
+        # database before one doesn't store its stale result
+        self.__generation = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """Current invalidation generation
+        """
+        return self.__generation
+
+    def get(self, column: str, value) -> Union[User, None]:
+        """
+        Return the cached user whose column equals value, or None
+        """
+        key = (column, value)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.hits += 1
+        return User(**entry[0])
+
+    def put(self, user: User, generation: int, session_id: str = None,
+            valid_for: float = None) -> None:
+        """
+        Cache a user under each cached column, or under one of its
+        session IDs, unless an invalidation happened since generation
+        Args:
+            valid_for (float): seconds left before the entry must go,
+                               if less than the TTL
+        """
+        if self.max_size <= 0:
+            return
+        columns = {c.name: getattr(user, c.name)
+                   for c in User.__table__.columns}
+        ttl = self.ttl if valid_for is None else min(self.ttl, valid_for)
+        expiry = time.monotonic() + ttl
+        if session_id is not None:
+            keys = [("session", session_id)]
+        else:
+            keys = [(column, columns[column]) for column in CACHED_COLUMNS
+                    if columns[column] is not None]
+        with self.__lock:
+            if generation != self.__generation:
+                return
+            for key in keys:
+                self.__entries[key] = (columns, expiry)
+                self.__entries.move_to_end(key)
+                self.__keys.setdefault(columns["id"], set()).add(key)
+            while len(self.__entries) > self.max_size:
+                self._drop(next(iter(self.__entries)))
+
+    def _drop(self, key: tuple) -> None:
+        """
+        Remove one entry, called with the lock held
+        """
+        columns, _ = self.__entries.pop(key)
+        keys = self.__keys.get(columns["id"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.__keys[columns["id"]]
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Remove every entry of a user
+        """
+        with self.__lock:
+            self.__generation += 1
+            for key in list(self.__keys.get(user_id, ())):
+                self._drop(key)
+
+    def stats(self) -> dict:
+        """
+        Hits, misses, hit ratio and size of the cache
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self.__entries),
+            }